@@ -3,18 +3,23 @@
 # ============================================
 
 # Install required packages if not already installed
-!pip install sentence-transformers transformers pandas beautifulsoup4 requests tqdm openpyxl
+!pip install sentence-transformers transformers pandas aiohttp tqdm openpyxl
 
 # -------------------------
 # Imports
 # -------------------------
 import os
-import requests
+import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup
 from tqdm import tqdm
-from sentence_transformers import SentenceTransformer, util
-from transformers import pipeline
+from model_registry import lazy_embedder, lazy_pipeline
+from compliance_scoring import score_document
+from summary_cache import summarize_paragraphs
+from generation_cache import GenerationCache
+from async_fetcher import fetch_all
+from html_stream import Extraction
+from encoding_pool import EncodingPool
+from corpus_store import open_corpus
 
 # -------------------------
 # Configuration
@@ -26,6 +31,12 @@ documents = {
     # Add more documents here
 }
 
+# Corpus-build mode for large document sets on CPU nodes: > 0 encodes every
+# paragraph up front across this many worker processes into one corpus file
+# (resumable after a crash); 0 encodes each document in this process
+ENCODE_WORKERS = 0
+DOCUMENTS_CORPUS_PATH = "data/processed/documents.corpus"
+
 # Compliance queries / rules
 compliance_rules = [
     {"rule": "Privacy policy adherence", "threshold": 0.3},
@@ -34,82 +45,94 @@ compliance_rules = [
     {"rule": "Accessibility compliance", "threshold": 0.2},
 ]
 
-# Initialize models
-print("Loading sentence-transformer model...")
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-print("Loading summarization model...")
-summarizer = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6")
+# Models load on first use, after the documents have been fetched
+embedding_model = lazy_embedder("all-MiniLM-L6-v2")
+summary_model = "sshleifer/distilbart-cnn-12-6"
+summarizer = lazy_pipeline("summarization", summary_model, device=-1)
+summary_cache = GenerationCache()
 
 # -------------------------
 # Helper Functions
 # -------------------------
+# Visible text split at block-level elements, parsed incrementally as each page downloads
+parse_blocks = Extraction()
+
+# Fetch all remote documents concurrently; unchanged pages (304) reuse their parsed blocks
+fetched_pages = fetch_all(
+    [url for url in documents.values() if url.startswith("http")],
+    parse=parse_blocks
+)
+
 def fetch_text(url):
     """Fetch and clean text from URL or local file"""
     if url.startswith("http"):
-        r = requests.get(url)
-        soup = BeautifulSoup(r.text, 'html.parser')
-        texts = soup.stripped_strings
-        return list(texts)
+        result = fetched_pages[url]
+        if result.error:
+            print(f"Failed to fetch {url}: {result.error}")
+        return result.data or []
     elif os.path.exists(url):
         with open(url, 'r', encoding='utf-8') as f:
             return f.readlines()
     else:
         return []
 
-def summarize_text(text):
-    """Summarize text using transformer model"""
-    try:
-        summary = summarizer(text, max_length=60, min_length=20, do_sample=False)
-        return summary[0]['summary_text']
-    except Exception as e:
-        return text  # fallback to original text if summarization fails
-
-def calculate_risk(similarity, threshold):
-    """Assign risk level based on similarity and threshold"""
-    if similarity >= threshold + 0.2:
-        return "High"
-    elif similarity >= threshold:
-        return "Medium"
-    else:
-        return "Low"
-
 # -------------------------
 # Process Documents
 # -------------------------
-results = []
+frames = []
 
 print("Processing documents and calculating compliance...")
 
+# Encode all rules once; every document is then scored with one matrix multiply
+rule_names = [rule['rule'] for rule in compliance_rules]
+rule_thresholds = [rule['threshold'] for rule in compliance_rules]
+rule_embeddings = embedding_model.encode(rule_names, convert_to_numpy=True)
+
+document_paragraphs = {doc_name: fetch_text(url) for doc_name, url in documents.items()}
+document_vectors = None
+if ENCODE_WORKERS:
+    pool = EncodingPool("all-MiniLM-L6-v2", workers=ENCODE_WORKERS)
+    pool.build_corpus(DOCUMENTS_CORPUS_PATH, [p for paras in document_paragraphs.values() for p in paras])
+    print(pool.report())
+    document_vectors = open_corpus(DOCUMENTS_CORPUS_PATH).vectors
+row = 0  # first corpus row of the current document
+
 for doc_name, url in tqdm(documents.items()):
-    paragraphs = fetch_text(url)
+    paragraphs = document_paragraphs[doc_name]
     print(f"Total paragraphs collected from {doc_name}: {len(paragraphs)}")
-    paragraph_embeddings = embedding_model.encode(paragraphs, convert_to_tensor=True)
-    
-    # Check against all compliance rules
-    for rule in compliance_rules:
-        rule_embedding = embedding_model.encode(rule['rule'], convert_to_tensor=True)
-        for i, para_emb in enumerate(paragraph_embeddings):
-            similarity = util.cos_sim(rule_embedding, para_emb).item()
-            risk = calculate_risk(similarity, rule['threshold'])
-            summary = summarize_text(paragraphs[i])
-            missing_actionable = "Yes" if similarity < rule['threshold'] else "No"
-            
-            results.append({
-                "Document": doc_name,
-                "Paragraph_ID": i+1,
-                "Doc_Type": "Legal" if "sec.gov" in url else "App",
-                "Text": paragraphs[i][:200] + ("..." if len(paragraphs[i])>200 else ""),
-                "Rule_Checked": rule['rule'],
-                "Similarity": round(similarity, 3),
-                "Risk_Level": risk,
-                "Summary": summary,
-                "Missing_Actionable": missing_actionable
-            })
+    if not paragraphs:
+        continue
+    if document_vectors is not None:
+        paragraph_embeddings = document_vectors[row:row + len(paragraphs)]
+        row += len(paragraphs)
+    else:
+        paragraph_embeddings = embedding_model.encode(paragraphs, convert_to_numpy=True)
+    scores = score_document(rule_embeddings, paragraph_embeddings, rule_thresholds)
+
+    # Rows are rule-major: every paragraph for rule 1, then rule 2, ...
+    n_rules, n_paras = scores["similarity"].shape
+    # Each distinct paragraph is summarized once, in batches, with cached results reused
+    summaries = summarize_paragraphs(
+        summarizer, paragraphs, summary_model, cache=summary_cache,
+        batch_size=8, max_length=60, min_length=20, do_sample=False
+    )
+    short_texts = [p[:200] + ("..." if len(p) > 200 else "") for p in paragraphs]
+    frames.append(pd.DataFrame({
+        "Document": doc_name,
+        "Paragraph_ID": np.tile(np.arange(1, n_paras + 1), n_rules),
+        "Doc_Type": "Legal" if "sec.gov" in url else "App",
+        "Text": short_texts * n_rules,
+        "Rule_Checked": np.repeat(rule_names, n_paras),
+        "Similarity": np.round(scores["similarity"].ravel().astype(float), 3),
+        "Risk_Level": scores["risk_level"].ravel(),
+        "Summary": summaries * n_rules,
+        "Missing_Actionable": scores["missing_actionable"].ravel(),
+    }))
 
 # -------------------------
 # Create DataFrame & Save
 # -------------------------
-df = pd.DataFrame(results)
+df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
 print("\nSample output:")
 print(df.head(10))
 
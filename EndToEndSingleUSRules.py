@@ -7,16 +7,15 @@ import sys
 !{sys.executable} -m pip install -q transformers sentence-transformers torch
 
 # Imports
-from transformers import pipeline
-from sentence_transformers import SentenceTransformer, util
-import torch, os, pandas as pd, numpy as np
+from model_registry import lazy_embedder, lazy_pipeline
+from batched_generation import explain_clauses
+from generation_cache import GenerationCache
+from segmented_corpus import SegmentedCorpus
+import os
 
 # Create folders
 os.makedirs('data/processed', exist_ok=True)
 
-print("Torch version:", torch.__version__)
-print("CUDA available:", torch.cuda.is_available())
-
 # =========================
 # Step 1: Sample legal clauses
 # =========================
@@ -34,40 +33,47 @@ print("Sample clause:\n", texts[0])
 # =========================
 # Step 2: Generate embeddings
 # =========================
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-corpus_embeddings = embedder.encode(texts, convert_to_tensor=True, show_progress_bar=True)
-
-# Save embeddings & clauses
-pd.DataFrame({"clause": texts}).to_csv("data/processed/clauses_sample.csv", index=False)
-np.save("data/processed/corpus_embeddings.npy", corpus_embeddings.cpu().numpy())
+embedder = lazy_embedder("all-MiniLM-L6-v2")
+
+# Only clauses not yet in the corpus are embedded; they land in a new small segment.
+# Amendments: segments.amend(clause_id, text, vector); removals: segments.delete([clause_id])
+segments = SegmentedCorpus("data/processed/clauses_segments", model_id="all-MiniLM-L6-v2")
+new_ids = segments.add_texts(texts, embedder)
+print(f"Added {len(new_ids)} new clauses, {len(segments)} live clauses in {len(segments.segments)} segments")
+# Segments are merged on a background thread once more than 8 accumulate
+compaction = segments.start_background_compaction(max_segments=8)
+
+# Snapshot the live clauses & embeddings into one corpus file for the downstream steps
+segments.export("data/processed/clauses.corpus")
 print("Embeddings saved!")
 
 # =========================
 # Step 3: Semantic search
 # =========================
 query = "data residency EU storage location"
-query_embedding = embedder.encode(query, convert_to_tensor=True)
-hits = util.semantic_search(query_embedding, corpus_embeddings, top_k=3)
+query_embedding = embedder.encode([query], convert_to_numpy=True)
+scores, clause_ids, hit_texts = segments.search(query_embedding, top_k=3)
 
 print("Top matching clauses:\n")
-for h in hits[0]:
-    print("Score:", h["score"])
-    print("Clause:\n", texts[h["corpus_id"]])
+for score, clause in zip(scores[0], hit_texts[0]):
+    print("Score:", score)
+    print("Clause:\n", clause)
     print("\n---\n")
 
 # =========================
 # Step 4: Summarization & Simplification
 # =========================
-device = 0 if torch.cuda.is_available() else -1
-
-summarizer = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6", device=device)
-simplifier = pipeline("text2text-generation", model="google/flan-t5-small", device=device)
+# Loaded on first use (on the GPU when available); thin clients of the model
+# server when COMPLIANCE_MODEL_SERVER is set
+summarizer = lazy_pipeline("summarization", "sshleifer/distilbart-cnn-12-6")
+simplifier = lazy_pipeline("text2text-generation", "google/flan-t5-small")
 
-sample_text = texts[hits[0][0]['corpus_id']]
+sample_text = hit_texts[0][0]
 
-summary = summarizer(sample_text, max_length=120, min_length=30, do_sample=False)[0]['summary_text']
-prompt = "Simplify the following legal clause into 3-4 clear action items for a system analyst:\n\n" + sample_text
-items = simplifier(prompt, max_length=200)[0]['generated_text']
+# All top hits are explained in two length-bucketed batched passes; the first is the sample
+prompt = "Simplify the following legal clause into 3-4 clear action items for a system analyst:\n\n{clause}"
+explanations = explain_clauses(summarizer, simplifier, hit_texts[0], prompt=prompt, cache=GenerationCache())
+summary, items = explanations[0]
 
 print("Summary:\n", summary)
 print("\nAction Items:\n", items)
@@ -83,3 +89,4 @@ with open("data/processed/sample_items.txt", "w", encoding="utf-8") as f:
     f.write(items)
 
 print("Saved outputs in data/processed/")
+compaction.stop()  # let a merge in progress finish before exiting
@@ -2,13 +2,14 @@
 # Step 6: Dynamic Compliance Check with Suggestions
 # =========================
 
-!pip install -q sentence-transformers requests beautifulsoup4 pandas
+!pip install -q sentence-transformers aiohttp pandas
 
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
 import numpy as np
-from sentence_transformers import SentenceTransformer, util
+from model_registry import lazy_embedder
+from rulebook import load_or_compile_rulebook
+from async_fetcher import fetch_all
+from html_stream import Extraction
 
 # -------------------------------
 # 1️⃣ Define pages to scrape
@@ -21,11 +22,12 @@ urls = {
 # -------------------------------
 # 2️⃣ Scrape page text dynamically
 # -------------------------------
+extract_paragraph_text = Extraction(tags=["p"], join=" ")
+
+fetched = fetch_all(urls.values(), parse=extract_paragraph_text)
 scraped_pages = {}
 for page_name, url in urls.items():
-    r = requests.get(url)
-    soup = BeautifulSoup(r.text, "html.parser")
-    text = " ".join(p.get_text() for p in soup.find_all("p"))
+    text = fetched[url].data or ""
     scraped_pages[page_name] = text
     print(f"Extracted text from {page_name}: {len(text)} characters")
 
@@ -45,8 +47,12 @@ print(f"Extracted {len(rules_df)} rules from {rules_df['source'].nunique()} sour
 # -------------------------------
 # 4️⃣ Initialize embedding model
 # -------------------------------
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
-print("Device set to use cuda" if embedder.device.type == "cuda" else "Using CPU")
+embedder = lazy_embedder("all-MiniLM-L6-v2")  # loaded only if the rulebook must be (re)compiled
+
+# Precompiled rule and metric-value embeddings for the US rule set
+rulebook = load_or_compile_rulebook(
+    embedder, dict(zip(rules_df['metric'], rules_df['rule'])), path="data/processed/us_rulebook.npz"
+)
 
 # -------------------------------
 # 5️⃣ Extract metrics from text dynamically using simple heuristics/keywords
@@ -88,10 +94,8 @@ def evaluate_compliance(page_name, text, metrics):
         rule_source = rule['source']
         metric_value = metrics.get(metric_name, "unknown")
         
-        # Compute similarity
-        rule_emb = embedder.encode([rule_text], convert_to_tensor=True)
-        metric_emb = embedder.encode([str(metric_value)], convert_to_tensor=True)
-        score = util.cos_sim(rule_emb, metric_emb).item()
+        # Compute similarity (precompiled lookup)
+        score = rulebook.score(metric_name, metric_value)
         
         compliant = score >= 0.4  # Threshold for compliance
         
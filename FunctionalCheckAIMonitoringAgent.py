@@ -1,14 +1,20 @@
-!pip install requests beautifulsoup4 sentence-transformers geoip2 pandas
-
-import requests, time, socket, ssl, geoip2.database
-from bs4 import BeautifulSoup
-from sentence_transformers import SentenceTransformer, util
+!pip install aiohttp sentence-transformers maxminddb pandas
+
+import time
+from model_registry import lazy_embedder
+from async_fetcher import fetch_all
+from html_stream import Extraction
+from incremental_monitor import IncrementalMonitor
+from functional_probes import FunctionalProber
+from geoip_index import check_ips_residency
+from chunking import score_pages
+import numpy as np
 import pandas as pd
 
 # ==========================================================
 # 1️⃣ Load AI Model for Textual Compliance
 # ==========================================================
-model = SentenceTransformer("all-MiniLM-L6-v2")
+model = lazy_embedder("all-MiniLM-L6-v2")
 
 # ==========================================================
 # 2️⃣ Dynamic Rule Extraction from Official Sources
@@ -19,25 +25,29 @@ rule_sources = {
     "CFPB": "https://www.consumerfinance.gov/policy-compliance/rulemaking/"
 }
 
+# <p> texts, extracted incrementally while each page downloads. Every paragraph
+# kept is scored, so the budget bounds the encode cost (~500 windows per page)
+PAGE_CHAR_BUDGET = 200_000
+extract_paragraphs = Extraction(tags=["p"], max_chars=PAGE_CHAR_BUDGET)
+extract_paragraph_text = Extraction(tags=["p"], join=" ")
+
 def fetch_rules():
     rules = []
+    fetched = fetch_all(rule_sources.values(), parse=extract_paragraph_text, timeout=10)
     for name, url in rule_sources.items():
-        try:
-            res = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
-            if res.status_code == 200:
-                soup = BeautifulSoup(res.text, "html.parser")
-                text = " ".join([p.get_text(strip=True) for p in soup.find_all("p")])
-                for sent in text.split("."):
-                    if any(k in sent.lower() for k in ["data", "security", "privacy", "encryption", "access", "storage"]):
-                        rules.append({"rule": sent.strip(), "source": name})
-        except Exception as e:
-            print(f"Error fetching {url}: {e}")
+        result = fetched[url]
+        if result.error:
+            print(f"Error fetching {url}: {result.error}")
+        elif result.status in (200, 304):
+            for sent in result.data.split("."):
+                if any(k in sent.lower() for k in ["data", "security", "privacy", "encryption", "access", "storage"]):
+                    rules.append({"rule": sent.strip(), "source": name})
     print(f"Extracted {len(rules)} rules from {len(rule_sources)} sources")
     return rules[:50]  # keep top 50 rules
 
 rules = fetch_rules()
 rule_texts = [r["rule"] for r in rules]
-rule_embeddings = model.encode(rule_texts, convert_to_tensor=True)
+rule_embeddings = model.encode(rule_texts, convert_to_numpy=True)
 
 # ==========================================================
 # 3️⃣ Dynamic Bank of America URLs
@@ -49,16 +59,16 @@ boa_sites = [
     "https://about.bankofamerica.com/en",
 ]
 
-def fetch_page_text(url):
-    try:
-        res = requests.get(url, timeout=10, headers={"User-Agent": "Mozilla/5.0"})
-        soup = BeautifulSoup(res.text, "html.parser")
-        return " ".join([p.get_text(strip=True) for p in soup.find_all("p")])
-    except Exception as e:
-        print(f"Error fetching {url}: {e}")
-        return ""
+def fetch_page_paragraphs(urls):
+    """Paragraph lists per URL (None where the fetch failed); unchanged pages come from the 304 cache"""
+    fetched = fetch_all(urls, parse=extract_paragraphs, timeout=10)
+    for url, result in fetched.items():
+        if result.error:
+            print(f"Error fetching {url}: {result.error}")
+    return {url: fetched[url].data if not fetched[url].error else None for url in urls}
 
-scraped_pages = {url: fetch_page_text(url) for url in boa_sites}
+# Scored paragraph by paragraph, the same way the monitoring agent scores them
+scraped_pages = {url: paragraphs or [] for url, paragraphs in fetch_page_paragraphs(boa_sites).items()}
 
 # ==========================================================
 # 4️⃣ Functional Compliance Checks
@@ -66,42 +76,36 @@ scraped_pages = {url: fetch_page_text(url) for url in boa_sites}
 def check_https(url):
     return url.lower().startswith("https://")
 
-def check_tls_version(url):
-    try:
-        hostname = url.replace("https://", "").split("/")[0]
-        ctx = ssl.create_default_context()
-        with socket.create_connection((hostname, 443), timeout=5) as sock:
-            with ctx.wrap_socket(sock, server_hostname=hostname) as ssock:
-                tls = ssock.version()
-                return tls in ["TLSv1.2", "TLSv1.3"], tls
-    except Exception as e:
-        return False, str(e)
-
-def check_data_location(ip):
-    try:
-        with geoip2.database.Reader('/usr/share/GeoIP/GeoLite2-Country.mmdb') as reader:
-            response = reader.country(ip)
-            country = response.country.iso_code
-            return country == "US", country
-    except Exception:
-        return False, "Unknown"
+# DNS and TLS probes run once per host, concurrently, and are cached between scans
+prober = FunctionalProber(dns_ttl=300, tls_ttl=3600, timeout=5)
 
 # ==========================================================
 # 5️⃣ Evaluation Engine (Textual + Functional)
 # ==========================================================
-def evaluate_site(url, page_text):
-    page_emb = model.encode(page_text[:3000], convert_to_tensor=True)
-    sims = util.cos_sim(page_emb, rule_embeddings).mean(dim=0)
-    best_idx = sims.argmax().item()
+def evaluate_site(url, paragraphs=None, rule_sims=None, probe=None, chunk_offsets=None):
+    """Textual + functional checks; pass precomputed `rule_sims` / `probe` results to reuse them.
+
+    Paragraphs are scored over overlapping chunks (max-pooled per rule); `chunk_offsets`
+    are the character spans of each rule's best chunk, as returned by score_pages.
+    """
+    if rule_sims is None:
+        page = score_pages(model, {url: paragraphs}, rule_embeddings)[url]
+        rule_sims, chunk_offsets = page["max_scores"], page["best_offsets"]
+    best_idx = int(np.argmax(rule_sims))
     matched_rule = rules[best_idx]["rule"]
     rule_source = rules[best_idx]["source"]
 
+    if probe is None:
+        probe = prober.probe([url])[url]
     https_ok = check_https(url)
-    tls_ok, tls_detail = check_tls_version(url)
-    try:
-        ip = socket.gethostbyname(url.replace("https://", "").replace("http://", "").split("/")[0])
-        region_ok, region_detail = check_data_location(ip)
-    except Exception:
+    tls_ok, tls_detail = probe["tls"]["ok"], probe["tls"]["version"]
+    if probe["dns"]["ok"]:
+        ips = probe["dns"]["ips"]
+        ip = next((addr for addr in ips if ":" not in addr), ips[0])  # prefer IPv4
+        # Every A/AAAA record of the host must resolve to an allowed country
+        region_ok, countries = check_ips_residency(ips)
+        region_detail = ",".join(sorted(set(countries.values())))
+    else:
         ip, region_ok, region_detail = "N/A", False, "Unknown"
 
     compliant = https_ok and tls_ok and region_ok
@@ -117,11 +121,21 @@ def evaluate_site(url, page_text):
         "region_ok": region_ok,
         "matched_rule": matched_rule,
         "rule_source": rule_source,
+        "matched_chunk": chunk_offsets[best_idx] if chunk_offsets is not None else None,
         "overall_compliant": compliant,
-        "suggestion": suggestion
+        "suggestion": suggestion,
+        "dns_latency_ms": round(probe["dns"]["latency_ms"], 1),
+        "tls_latency_ms": round(probe["tls"]["latency_ms"], 1),
     }
 
-results = [evaluate_site(url, text) for url, text in scraped_pages.items()]
+probes = prober.probe(list(scraped_pages))
+# Every chunk of every page is encoded in one batch, then pooled per page
+page_scores = score_pages(model, scraped_pages, rule_embeddings)
+results = [
+    evaluate_site(url, rule_sims=page_scores[url]["max_scores"], probe=probes[url],
+                  chunk_offsets=page_scores[url]["best_offsets"])
+    for url in scraped_pages
+]
 df = pd.DataFrame(results)
 print(df)
 
@@ -130,11 +144,17 @@ print(df)
 # ==========================================================
 def monitoring_agent(interval=600):
     print("\n🔁 Starting Compliance Monitoring Agent...\n")
+    # Pages are re-fetched every cycle and scored over the same token windows as above;
+    # only paragraphs that were added or changed are re-embedded
+    monitor = IncrementalMonitor(model, rule_embeddings, fetch_page_paragraphs)
     while True:
-        for url, text in scraped_pages.items():
-            result = evaluate_site(url, text)
+        scan = monitor.scan(boa_sites)
+        probes = prober.probe(boa_sites)
+        for url, page in scan.items():
+            result = evaluate_site(url, rule_sims=page["rule_scores"], probe=probes[url],
+                                   chunk_offsets=page["best_offsets"])
             status = "✅ OK" if result["overall_compliant"] else "🚨 Non-Compliant"
-            print(f"[{status}] {url} | {result['suggestion']}")
+            print(f"[{status}] {url} | {result['suggestion']} | +{page['added']}/-{page['removed']} paragraphs")
         print("\nSleeping before next scan...\n")
         time.sleep(interval)  # every 10 mins
 
@@ -1,24 +1,26 @@
 # -------------------------------
 # Required Libraries
 # -------------------------------
-!pip install sentence-transformers transformers pandas requests beautifulsoup4 tqdm
+!pip install sentence-transformers transformers pandas aiohttp tqdm
 
-import requests
-from bs4 import BeautifulSoup
 import pandas as pd
-from sentence_transformers import SentenceTransformer, util
+from compliance_scoring import normalize_rows
+from vector_index import top_k_rows
+from alignment import align_all_pairs
+from model_registry import lazy_embedder, lazy_pipeline
+from summary_cache import summarize_paragraphs
+from generation_cache import GenerationCache
+from async_fetcher import fetch_all
+from html_stream import Extraction
 
 # -------------------------------
 # Step 1: Collect Legal Documents & Domain Docs
 # -------------------------------
 
+extract_paragraphs = Extraction(tags=["p"], min_length=20)  # <p> texts over 20 characters
+
 # Example legal document (public)
 legal_doc_url = "https://www.sec.gov/about/laws.shtml"  # US Securities Laws page
-response = requests.get(legal_doc_url)
-soup = BeautifulSoup(response.text, "html.parser")
-
-# Extract text paragraphs
-legal_paragraphs = [p.get_text(strip=True) for p in soup.find_all("p") if len(p.get_text(strip=True)) > 20]
 
 # Example Bank of America app documentation (publicly available)
 boa_doc_urls = [
@@ -26,12 +28,13 @@ boa_doc_urls = [
     "https://www.bankofamerica.com/deposits/online-banking-features/"
 ]
 
+# Fetch every page concurrently, then extract text paragraphs
+fetched = fetch_all([legal_doc_url] + boa_doc_urls, parse=extract_paragraphs)
+legal_paragraphs = fetched[legal_doc_url].data or []
+
 app_paragraphs = []
 for url in boa_doc_urls:
-    res = requests.get(url)
-    soup = BeautifulSoup(res.text, "html.parser")
-    paras = [p.get_text(strip=True) for p in soup.find_all("p") if len(p.get_text(strip=True)) > 20]
-    app_paragraphs.extend(paras)
+    app_paragraphs.extend(fetched[url].data or [])
 
 # Combine into DataFrames
 legal_df = pd.DataFrame({"document": "Legal", "text": legal_paragraphs})
@@ -44,11 +47,13 @@ print(f"Total paragraphs collected: {len(all_docs_df)}")
 # Step 2: Embedding and Contextual Understanding
 # -------------------------------
 
-# Load pre-trained sentence-transformer
-model = SentenceTransformer('all-MiniLM-L6-v2')
+# Sentence-transformer, loaded on first encode
+model = lazy_embedder("all-MiniLM-L6-v2")
 
-# Generate embeddings
-all_docs_df['embedding'] = all_docs_df['text'].apply(lambda x: model.encode(x, convert_to_tensor=True))
+# One batched encode into a contiguous (paragraphs, dim) matrix; row i is all_docs_df row i
+embeddings = normalize_rows(model.encode(all_docs_df['text'].tolist(), batch_size=64, convert_to_numpy=True))
+legal_embeddings = embeddings[:len(legal_df)]
+app_embeddings = embeddings[len(legal_df):]
 
 # -------------------------------
 # Step 3: Semantic Search / Contextual Matching
@@ -56,29 +61,54 @@ all_docs_df['embedding'] = all_docs_df['text'].apply(lambda x: model.encode(x, c
 
 # Example: Check which legal clauses relate to app functionality
 query = "Privacy policy adherence for user data in mobile banking app"
-query_emb = model.encode(query, convert_to_tensor=True)
+query_emb = normalize_rows(model.encode(query, convert_to_numpy=True))
 
-# Compute similarity
-all_docs_df['similarity'] = all_docs_df['embedding'].apply(lambda x: util.cos_sim(query_emb, x).item())
+# Cosine similarity of the query against every paragraph in one matrix-vector product
+all_docs_df['similarity'] = embeddings @ query_emb[0]
 
-# Sort by most relevant
-relevant_docs = all_docs_df.sort_values(by='similarity', ascending=False).head(10)
+# Top 10 by partial sort (argpartition), not a full sort of the corpus
+top_ids, _ = top_k_rows(all_docs_df['similarity'].to_numpy()[None, :], 10)
+relevant_docs = all_docs_df.iloc[top_ids[0]].copy()
 
 # Display top relevant paragraphs
 for idx, row in relevant_docs.iterrows():
     print(f"[{row['document']}] Similarity: {row['similarity']:.3f}\n{row['text']}\n{'-'*80}")
 
+# -------------------------------
+# Step 3b: Legal ↔ App Alignment
+# -------------------------------
+
+# Every legal paragraph finds its supporting app paragraphs. Scores are computed
+# in tiles across a thread pool, keeping only the top 3 per clause above 0.3.
+legal_ids, app_ids, scores = align_all_pairs(legal_embeddings, app_embeddings, top_k=3, min_score=0.3)
+alignment = pd.DataFrame({
+    "legal_id": legal_ids,
+    "app_id": app_ids,
+    "score": scores,
+    "legal_text": legal_df['text'].to_numpy()[legal_ids],
+    "app_text": app_df['text'].to_numpy()[app_ids],
+})
+unsupported = len(legal_df) - alignment['legal_id'].nunique()
+print(f"Aligned {len(legal_df)} legal paragraphs against {len(app_df)} app paragraphs: "
+      f"{len(alignment)} pairs, {unsupported} clauses without a supporting app paragraph")
+print(alignment.nlargest(10, 'score')[['score', 'legal_text', 'app_text']].to_string(index=False))
+alignment[['legal_id', 'app_id', 'score']].to_csv("legal_app_alignment.csv", index=False)
+
 # -------------------------------
 # Step 4: Human-Readable Summary (optional)
 # -------------------------------
 # For each relevant paragraph, you can use a summarization model (transformers) to convert
 # legal clauses into simplified statements.
-from transformers import pipeline
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-
-relevant_docs['summary'] = relevant_docs['text'].apply(
-    lambda x: summarizer(x, max_length=100, min_length=30, do_sample=False)[0]['summary_text']
+summary_model = "facebook/bart-large-cnn"
+summarizer = lazy_pipeline("summarization", summary_model, device=-1)
+generation_cache = GenerationCache()
+
+# Batched, and paragraphs summarized on earlier runs come from the generation cache
+relevant_docs['summary'] = summarize_paragraphs(
+    summarizer, relevant_docs['text'].tolist(), summary_model, cache=generation_cache,
+    max_length=100, min_length=30, do_sample=False
 )
+print("Generation cache:", generation_cache.stats())
 
 # Print summaries
 for idx, row in relevant_docs.iterrows():
@@ -3,18 +3,20 @@
 # =========================
 
 import json
-import numpy as np
 import pandas as pd
-from sentence_transformers import SentenceTransformer, util
+from model_registry import lazy_embedder
+from corpus_store import open_corpus
+from rulebook import METRIC_VALUES, load_or_compile_rulebook
+from fleet_evaluator import build_reports, evaluate_fleet, metrics_table
 from IPython.display import display, Markdown
 
 # -------------------------------
 # Load Step 1 & 2 outputs
 # -------------------------------
-clauses_df = pd.read_csv("data/processed/clauses_sample.csv")
-clauses = clauses_df['clause'].tolist()
-corpus_embeddings = np.load("data/processed/corpus_embeddings.npy")
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+corpus = open_corpus("data/processed/clauses.corpus", model_id="all-MiniLM-L6-v2")
+clauses = corpus.texts
+corpus_embeddings = corpus.vectors
+embedder = lazy_embedder("all-MiniLM-L6-v2")
 
 # -------------------------------
 # Simulated applications and metrics
@@ -32,32 +34,20 @@ smart_contracts = {
     "sensitive_access": "Access to sensitive data must be restricted to authorized personnel"
 }
 
+# Precompiled rule and metric-value embeddings
+metric_values = METRIC_VALUES + [v for m in applications.values() for v in m.values()]
+rulebook = load_or_compile_rulebook(embedder, smart_contracts, metric_values)
+
 # -------------------------------
-# Monitoring agent function
+# Monitoring agent: score the whole fleet at once
 # -------------------------------
 compliance_reports = {}  # capture reports in memory for Step 5
 
-def monitor_application(app_name, metrics):
+def report_application(app_name, report):
     print(f"\nMonitoring {app_name}...")
-    alerts = []
-    suggested_changes = []
-    
-    for key, rule_text in smart_contracts.items():
-        if key in metrics:
-            metric_value = metrics[key]
-            
-            # Semantic similarity between rule and metric
-            rule_emb = embedder.encode([rule_text], convert_to_tensor=True)
-            metric_emb = embedder.encode([str(metric_value)], convert_to_tensor=True)
-            score = util.cos_sim(rule_emb, metric_emb).item()
-            
-            # Compliance threshold
-            if score < 0.4:
-                alert_msg = f"⚠ Non-compliance on {key}: value='{metric_value}' vs rule='{rule_text}' (score={score:.2f})"
-                suggested_change = f"Change '{key}' of {app_name} to comply with: '{rule_text}'"
-                alerts.append(alert_msg)
-                suggested_changes.append(suggested_change)
-    
+    alerts = report["alerts"]
+    suggested_changes = report["suggested_changes"]
+
     # Reporting
     if not alerts:
         print("✅ All metrics compliant")
@@ -66,14 +56,9 @@ def monitor_application(app_name, metrics):
         print("\nSuggested Actions:")
         for action in suggested_changes:
             print("-", action)
-    
+
     # Save report for each app
-    report = {
-        "app_name": app_name,
-        "compliant": len(alerts) == 0,
-        "alerts": alerts,
-        "suggested_changes": suggested_changes
-    }
+    report["compliant"] = len(alerts) == 0
     compliance_reports[app_name] = report  # save in memory
     with open(f"data/processed/{app_name}_compliance_report.json", "w") as f:
         json.dump(report, f, indent=2)
@@ -81,8 +66,9 @@ def monitor_application(app_name, metrics):
 # -------------------------------
 # Run agents for all applications
 # -------------------------------
-for app, metrics in applications.items():
-    monitor_application(app, metrics)
+fleet = evaluate_fleet(rulebook, metrics_table(applications, rulebook.rule_keys))
+for app, report in build_reports(fleet, rulebook).items():
+    report_application(app, report)
 
 print("\nAll compliance reports saved in 'data/processed/'")
 
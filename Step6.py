@@ -2,21 +2,24 @@
 # Step 6: Live Website Scraping + AI Compliance Monitoring
 # =========================
 
-import requests
-from bs4 import BeautifulSoup
 import json
-from sentence_transformers import SentenceTransformer, util
+from model_registry import lazy_embedder
+from corpus_store import open_corpus
+from vector_index import load_or_build_index
+from rulebook import load_or_compile_rulebook
+from async_fetcher import fetch_all
+from html_stream import Extraction
+from chunking import encode_chunks, pool_hits
 
 # -------------------------------
 # Load Step 1 embeddings and clauses
 # -------------------------------
-import numpy as np
-import pandas as pd
 
-clauses_df = pd.read_csv("data/processed/clauses_sample.csv")
-clauses = clauses_df['clause'].tolist()
-corpus_embeddings = np.load("data/processed/corpus_embeddings.npy")
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+corpus = open_corpus("data/processed/clauses.corpus", model_id="all-MiniLM-L6-v2")
+clauses = corpus.texts
+corpus_index = load_or_build_index(corpus.vectors, "data/processed/corpus_index.npz",
+                                   fingerprint=corpus.header["checksum"], normalized=corpus.normalized)
+embedder = lazy_embedder("all-MiniLM-L6-v2")
 
 # -------------------------------
 # URLs to scrape
@@ -29,16 +32,21 @@ urls = {
 # -------------------------------
 # Scrape pages and extract text
 # -------------------------------
+# Whole visible text, parsed while it downloads; the download stops at the budget.
+# Every character kept is scored (in overlapping chunks below), so the budget also
+# bounds the encode cost: 200k characters is about 500 MiniLM windows per page
+PAGE_CHAR_BUDGET = 200_000
+extract_text = Extraction(max_chars=PAGE_CHAR_BUDGET, join=" ")
+
+fetched = fetch_all(urls.values(), parse=extract_text)
 pages_text = {}
 for page_name, url in urls.items():
-    try:
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, "html.parser")
-        text = soup.get_text(separator=" ", strip=True)[:5000]  # first 5000 chars
-        pages_text[page_name] = text
-        print(f"Extracted text from {page_name}: {len(text)} characters")
-    except Exception as e:
-        print(f"Failed to scrape {url}: {e}")
+    result = fetched[url]
+    if result.error:
+        print(f"Failed to scrape {url}: {result.error}")
+        continue
+    pages_text[page_name] = result.data
+    print(f"Extracted text from {page_name}: {len(result.data)} characters")
 
 # -------------------------------
 # Define smart contract rules
@@ -48,15 +56,28 @@ smart_contracts = {
     "sensitive_access": "Access to sensitive data must be restricted to authorized personnel"
 }
 
+# Precompiled rule and metric-value embeddings
+rulebook = load_or_compile_rulebook(embedder, smart_contracts)
+
+# -------------------------------
+# Clause matching over overlapping page chunks
+# -------------------------------
+# Every chunk of every page is encoded in one batch and searched at once; a clause's
+# page score is its best chunk score
+chunk_owners, chunk_offsets, chunk_embs = encode_chunks(embedder, pages_text)
+if chunk_embs is not None:
+    chunk_scores, chunk_ids = corpus_index.search(chunk_embs, top_k=3)
+    page_hits = pool_hits(chunk_owners, chunk_offsets, chunk_scores, chunk_ids, top_k=3)
+else:
+    page_hits = {}
+
 # -------------------------------
 # Monitoring function
 # -------------------------------
 def monitor_page(page_name, text):
     print(f"\nTop clauses matched for {page_name}:")
-    text_emb = embedder.encode([text], convert_to_tensor=True)
-    hits = util.semantic_search(text_emb, corpus_embeddings, top_k=3)[0]
-    for h in hits:
-        print("-", clauses[h["corpus_id"]])
+    for corpus_id, score, (start, end) in page_hits.get(page_name, []):
+        print(f"- {clauses[corpus_id]} (score={score:.2f}, page chars {start}-{end})")
     
     print(f"\nMonitoring {page_name}...")
     alerts = []
@@ -71,9 +92,7 @@ def monitor_page(page_name, text):
     for key, rule_text in smart_contracts.items():
         if key in metrics:
             metric_value = metrics[key]
-            rule_emb = embedder.encode([rule_text], convert_to_tensor=True)
-            metric_emb = embedder.encode([str(metric_value)], convert_to_tensor=True)
-            score = util.cos_sim(rule_emb, metric_emb).item()
+            score = rulebook.score(key, metric_value)
             
             if score < 0.4:
                 alert_msg = f"⚠ Non-compliance on {key}: value='{metric_value}' vs rule='{rule_text}' (score={score:.2f})"
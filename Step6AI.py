@@ -2,20 +2,16 @@
 # Step 6: Dynamic Live Web Page Compliance Check
 # =========================
 
-import requests
-from bs4 import BeautifulSoup
-from sentence_transformers import SentenceTransformer, util
+from model_registry import lazy_embedder
+from corpus_store import open_corpus
+from rulebook import load_or_compile_rulebook
+from async_fetcher import fetch_all
+from html_stream import Extraction
 import numpy as np
 
-# Device setup for embeddings
-import torch
-device = "cuda" if torch.cuda.is_available() else "cpu"
-print("Device set to use", device)
-
 # Load Step 1 clauses and embedder
-clauses_df = pd.read_csv("data/processed/clauses_sample.csv")
-clauses = clauses_df['clause'].tolist()
-embedder = SentenceTransformer("all-MiniLM-L6-v2", device=device)
+clauses = open_corpus("data/processed/clauses.corpus", model_id="all-MiniLM-L6-v2").texts
+embedder = lazy_embedder("all-MiniLM-L6-v2")  # GPU picked at load time when available
 
 # Define URLs to check
 urls = {
@@ -32,19 +28,24 @@ smart_contracts = {
     "sensitive_access": "Access to sensitive data must be restricted to authorized personnel"
 }
 
+# Precompiled rule and metric-value embeddings
+rulebook = load_or_compile_rulebook(embedder, smart_contracts)
+
 # -------------------------------
 # Function to scrape text from URL
 # -------------------------------
+# Visible text up to 5000 characters; parsing and the download stop once they are read
+extract_text = Extraction(max_chars=5000, join=" ")
+
+# All pages are fetched concurrently up front
+fetched = fetch_all(urls.values(), parse=extract_text, timeout=10)
+
 def scrape_text(url):
-    try:
-        r = requests.get(url, timeout=10)
-        soup = BeautifulSoup(r.text, "html.parser")
-        # Extract all text and limit to first 5000 characters
-        text = soup.get_text(separator=' ', strip=True)
-        return text[:5000]
-    except Exception as e:
-        print(f"Error scraping {url}: {e}")
+    result = fetched[url]
+    if result.error:
+        print(f"Error scraping {url}: {result.error}")
         return ""
+    return result.data or ""
 
 # -------------------------------
 # Function to extract metrics using AI/NLP
@@ -67,10 +68,8 @@ def evaluate_compliance(page_text, metrics):
     for key, rule_text in smart_contracts.items():
         if key in metrics:
             metric_value = metrics[key]
-            # Semantic similarity using embeddings
-            rule_emb = embedder.encode([rule_text], convert_to_tensor=True)
-            metric_emb = embedder.encode([str(metric_value)], convert_to_tensor=True)
-            score = util.cos_sim(rule_emb, metric_emb).item()
+            # Semantic similarity using precompiled embeddings
+            score = rulebook.score(key, metric_value)
             
             if score < 0.4:
                 alerts.append(f"⚠ Non-compliance on {key}: value='{metric_value}' vs rule='{rule_text}' (score={score:.2f})")
@@ -0,0 +1,170 @@
+# =========================
+# Async Fetcher — pooled connections, per-host limits, conditional GETs, retries
+# =========================
+
+import asyncio
+import json
+import os
+import random
+import threading
+import time
+from collections import namedtuple
+
+import aiohttp
+
+from html_stream import STREAM_CHUNK
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+DEFAULT_VALIDATOR_PATH = "data/cache/http_validators.json"
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# status is None when every attempt failed; `data` is the parsed page (reused from cache on 304)
+FetchResult = namedtuple("FetchResult", ["url", "status", "data", "not_modified", "error", "elapsed"])
+
+
+class ValidatorStore:
+    """ETag / Last-Modified validators plus the parsed result they belong to, persisted as JSON"""
+
+    def __init__(self, path=DEFAULT_VALIDATOR_PATH):
+        self.path = path
+        self.entries = {}
+        if path and os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                self.entries = json.load(f)
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, etag, last_modified, data):
+        if etag or last_modified:
+            self.entries[key] = {"etag": etag, "last_modified": last_modified, "data": data}
+        else:
+            self.entries.pop(key, None)
+
+    def save(self):
+        if not self.path:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(tmp_path, self.path)
+
+
+class AsyncFetcher:
+    """Fetch many URLs concurrently over one keep-alive connection pool.
+
+    Concurrency is bounded per host, previously seen pages are requested with
+    If-None-Match / If-Modified-Since so unchanged pages come back as 304 and are
+    not parsed again, and transient failures are retried with exponential backoff.
+    """
+
+    def __init__(self, per_host_limit=4, total_limit=32, timeout=10, retries=3, backoff=0.5,
+                 headers=None, validators=None):
+        self.per_host_limit = per_host_limit
+        self.total_limit = total_limit
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.headers = dict(DEFAULT_HEADERS, **(headers or {}))
+        self.validators = validators if validators is not None else ValidatorStore()
+
+    async def fetch(self, session, url, parse=None, namespace="raw"):
+        # Parsers that describe their options (html_stream.Extraction) key their own results
+        key = f"{getattr(parse, 'cache_key', namespace)}:{url}"
+        cached = self.validators.get(key)
+        headers = {}
+        if cached:
+            if cached.get("etag"):
+                headers["If-None-Match"] = cached["etag"]
+            if cached.get("last_modified"):
+                headers["If-Modified-Since"] = cached["last_modified"]
+
+        start = time.perf_counter()
+        error = None
+        for attempt in range(self.retries + 1):
+            try:
+                async with session.get(url, headers=headers) as resp:
+                    if resp.status == 304 and cached:
+                        return FetchResult(url, 304, cached["data"], True, None, time.perf_counter() - start)
+                    if resp.status in RETRY_STATUSES and attempt < self.retries:
+                        error = f"HTTP {resp.status}"
+                    else:
+                        if hasattr(parse, "stream"):
+                            data = await self._parse_stream(resp, parse)
+                        else:
+                            text = await resp.text(errors="replace")
+                            data = text
+                            if parse is not None:
+                                data = await asyncio.get_running_loop().run_in_executor(None, parse, text)
+                        if resp.status == 200:
+                            self.validators.put(
+                                key, resp.headers.get("ETag"), resp.headers.get("Last-Modified"), data
+                            )
+                        return FetchResult(url, resp.status, data, False, None, time.perf_counter() - start)
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                error = str(e) or type(e).__name__
+            if attempt < self.retries:
+                await asyncio.sleep(self.backoff * (2 ** attempt) * (1 + random.random() / 4))
+        return FetchResult(url, None, None, False, error, time.perf_counter() - start)
+
+    @staticmethod
+    async def _parse_stream(resp, parse):
+        """Feed the body to a streaming parser (see html_stream.Extraction) as it arrives.
+
+        Parsing runs in the executor chunk by chunk; once the parser has what it
+        needs the rest of the body is never downloaded.
+        """
+        stream = parse.stream(resp.charset or "utf-8")
+        loop = asyncio.get_running_loop()
+        items = []
+        async for chunk in resp.content.iter_chunked(STREAM_CHUNK):
+            items.extend(await loop.run_in_executor(None, stream.feed, chunk))
+            if stream.exhausted:
+                break
+        else:
+            items.extend(stream.close())
+        return parse.result(items)
+
+    async def fetch_all_async(self, urls, parse=None, namespace="raw"):
+        urls = list(dict.fromkeys(urls))
+        connector = aiohttp.TCPConnector(limit=self.total_limit, limit_per_host=self.per_host_limit)
+        timeout = aiohttp.ClientTimeout(total=self.timeout)
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout, headers=self.headers) as session:
+            results = await asyncio.gather(*(self.fetch(session, url, parse, namespace) for url in urls))
+        self.validators.save()
+        return dict(zip(urls, results))
+
+
+def run_coroutine(coro):
+    """Run a coroutine to completion, also from inside a running loop (Jupyter / Colab)"""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    outcome = {}
+
+    def runner():
+        try:
+            outcome["value"] = asyncio.run(coro)
+        except BaseException as e:
+            outcome["error"] = e
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    if "error" in outcome:
+        raise outcome["error"]
+    return outcome["value"]
+
+
+def fetch_all(urls, parse=None, namespace="raw", **fetcher_kwargs):
+    """Fetch all URLs concurrently; returns {url: FetchResult}.
+
+    `parse` turns the HTML into whatever the caller needs and must return JSON-serializable
+    data; streaming parsers (html_stream.Extraction) consume the body as it downloads.
+    Cached results are keyed on an Extraction's options; for other parsers,
+    `namespace` keeps their cached results apart.
+    """
+    fetcher = AsyncFetcher(**fetcher_kwargs)
+    return run_coroutine(fetcher.fetch_all_async(urls, parse, namespace))
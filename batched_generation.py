@@ -0,0 +1,82 @@
+# =========================
+# Batched Generation — length-bucketed seq2seq passes for clause explanations
+# =========================
+#
+# Running distilbart / flan-t5 one clause at a time leaves the model mostly idle.
+# Here inputs are sorted by token length and grouped into buckets, so every batch
+# pads to a similar length, and each bucket is decoded in one generate call.
+# Results are returned in the caller's order.
+
+import math
+
+from generation_cache import cached_generate, model_id_of
+
+SUMMARY_KWARGS = {"max_length": 120, "min_length": 30, "do_sample": False}
+SIMPLIFY_KWARGS = {"max_length": 200}
+ACTION_ITEMS_PROMPT = "Simplify the following legal clause into 3-4 clear action items:\n\n{clause}"
+DEFAULT_BATCH_SIZE = 16
+DEFAULT_MAX_BATCH_TOKENS = 8192  # padded input tokens per batch (batch size x longest input)
+WORDS_TO_TOKENS = 1.3
+
+
+def token_lengths(texts, tokenizer=None):
+    """Input length of each text in tokens (estimated from word counts without a tokenizer)"""
+    if tokenizer is not None:
+        return [len(ids) for ids in tokenizer(list(texts), truncation=True)["input_ids"]]
+    return [math.ceil(len(t.split()) * WORDS_TO_TOKENS) + 2 for t in texts]
+
+
+def length_buckets(lengths, batch_size=DEFAULT_BATCH_SIZE, max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS):
+    """Index batches of similar length: at most `batch_size` items and `max_batch_tokens` padded tokens"""
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    buckets, current = [], []
+    for i in order:
+        # Sorted ascending, so the newest item is the longest in its bucket
+        if current and (len(current) >= batch_size or (len(current) + 1) * lengths[i] > max_batch_tokens):
+            buckets.append(current)
+            current = []
+        current.append(i)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+def generate_bucketed(pipe, texts, output_key, batch_size=DEFAULT_BATCH_SIZE,
+                      max_batch_tokens=DEFAULT_MAX_BATCH_TOKENS, **gen_kwargs):
+    """Run a transformers pipeline over `texts` in length buckets; outputs follow the input order.
+
+    Every batch gets the same `gen_kwargs`, so a text's output does not depend on
+    which other texts share its batch.
+    """
+    texts = list(texts)
+    lengths = token_lengths(texts, getattr(pipe, "tokenizer", None))
+    outputs = [None] * len(texts)
+    for bucket in length_buckets(lengths, batch_size, max_batch_tokens):
+        batch = [texts[i] for i in bucket]
+        try:
+            results = pipe(batch, batch_size=len(batch), truncation=True, **gen_kwargs)
+        except Exception:
+            # One bad input fails the whole batch; retry individually so the error points at it
+            results = [pipe(text, truncation=True, **gen_kwargs)[0] for text in batch]
+        for i, result in zip(bucket, results):
+            outputs[i] = result[output_key]
+    return outputs
+
+
+def explain_clauses(summarizer, simplifier, clauses, prompt=ACTION_ITEMS_PROMPT, batch_size=DEFAULT_BATCH_SIZE,
+                    summary_kwargs=SUMMARY_KWARGS, simplify_kwargs=SIMPLIFY_KWARGS, cache=None):
+    """(summary, action items) for every clause: one bucketed summarization pass, then one simplification pass.
+
+    With a GenerationCache, only clauses not generated before (for the same models,
+    prompt and kwargs) are decoded.
+    """
+    def summarize(texts, **kwargs):
+        return generate_bucketed(summarizer, texts, "summary_text", batch_size=batch_size, **kwargs)
+
+    def simplify(texts, **kwargs):
+        prompts = [prompt.format(clause=clause) for clause in texts]
+        return generate_bucketed(simplifier, prompts, "generated_text", batch_size=batch_size, **kwargs)
+
+    summaries = cached_generate(cache, clauses, model_id_of(summarizer), summarize, **summary_kwargs)
+    items = cached_generate(cache, clauses, model_id_of(simplifier), simplify, template=prompt, **simplify_kwargs)
+    return list(zip(summaries, items))
@@ -0,0 +1,97 @@
+# =========================
+# Benchmark — eager PyTorch vs int8 ONNX Runtime embedder on CPU
+# =========================
+#
+#   python bench_embedding_backends.py                  # texts from data/processed/clauses.corpus
+#   python bench_embedding_backends.py --texts 5000 --threads 4
+#
+# Reports batch throughput (texts/s) and single-text latency (p50 / p95) for both
+# backends, and the cosine agreement of the ONNX vectors with the eager ones.
+# Exits 1 if any vector falls outside onnx_embedder.COSINE_TOLERANCE.
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+from compliance_scoring import normalize_rows
+from corpus_store import DEFAULT_CORPUS_PATH, open_corpus
+from onnx_embedder import COSINE_TOLERANCE, load_onnx_embedder
+
+SAMPLE_CLAUSES = [
+    "All customer data must be stored within the European Union.",
+    "Employees must comply with the company's cybersecurity policy.",
+    "Third-party vendors must sign a data protection agreement.",
+    "All financial transactions must be logged and auditable.",
+    "Access to sensitive data must be restricted to authorized personnel.",
+    "Users can deposit checks by taking a photo with the mobile banking app.",
+    "Customers may opt out of sharing personal information with affiliates at any time.",
+    "Account alerts notify you of low balances, large withdrawals and password changes.",
+]
+
+
+def benchmark_texts(corpus_path, count):
+    if os.path.exists(corpus_path):
+        texts = list(open_corpus(corpus_path).texts[:count])
+        if texts:
+            return texts
+    # Without a corpus: sample clauses combined into varied lengths
+    rng = np.random.default_rng(0)
+    return [" ".join(rng.choice(SAMPLE_CLAUSES, size=rng.integers(1, 6))) for _ in range(count)]
+
+
+def throughput(model, texts, batch_size):
+    model.encode(texts[:batch_size], batch_size=batch_size)  # warm-up
+    start = time.perf_counter()
+    vectors = model.encode(texts, batch_size=batch_size, convert_to_numpy=True)
+    return len(texts) / (time.perf_counter() - start), np.asarray(vectors)
+
+
+def latency(model, texts, runs):
+    timings = []
+    for text in texts[:runs]:
+        start = time.perf_counter()
+        model.encode([text], convert_to_numpy=True)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.percentile(timings, 50), np.percentile(timings, 95)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_PATH)
+    parser.add_argument("--texts", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--latency-runs", type=int, default=200)
+    parser.add_argument("--threads", type=int, default=None, help="CPU threads for both backends")
+    args = parser.parse_args()
+
+    import torch
+    from sentence_transformers import SentenceTransformer
+    if args.threads:
+        torch.set_num_threads(args.threads)
+    texts = benchmark_texts(args.corpus, args.texts)
+    backends = {
+        "eager fp32": SentenceTransformer(args.model, device="cpu"),
+        "onnx int8": load_onnx_embedder(args.model, threads=args.threads),
+    }
+
+    vectors = {}
+    print(f"{len(texts)} texts, batch size {args.batch_size}")
+    for name, model in backends.items():
+        rate, vectors[name] = throughput(model, texts, args.batch_size)
+        p50, p95 = latency(model, texts, args.latency_runs)
+        print(f"  {name:10s}  {rate:8.0f} texts/s   single text p50 {p50:6.2f} ms  p95 {p95:6.2f} ms")
+
+    cosines = np.sum(normalize_rows(vectors["eager fp32"]) * normalize_rows(vectors["onnx int8"]), axis=1)
+    print(f"Cosine(onnx, eager): mean {cosines.mean():.4f}, min {cosines.min():.4f} "
+          f"(required >= {1 - COSINE_TOLERANCE:.2f})")
+    if cosines.min() < 1 - COSINE_TOLERANCE:
+        print("FAIL: ONNX vectors outside the cosine tolerance")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
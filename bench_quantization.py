@@ -0,0 +1,83 @@
+# =========================
+# Benchmark — quantized and reduced-dimension corpus tiers: memory, latency and recall loss
+# =========================
+#
+#   python bench_quantization.py                      # data/processed/clauses.corpus
+#   python bench_quantization.py --synthetic 1000000  # clustered random vectors
+#
+# Recall@k is measured against an exact float32 scan, both for the compressed scan
+# alone (phase 1) and after exact rescoring of the top candidates (phase 2).
+# Reduced-dimension tiers (pca / prefix) use --dims columns.
+
+import argparse
+import os
+import time
+
+import numpy as np
+
+from compliance_scoring import normalize_rows
+from corpus_store import DEFAULT_CORPUS_PATH, open_corpus
+from projection import ReducedIndex
+from quantization import ENCODINGS, QuantizedIndex, approximate_scores
+from vector_index import REDUCED_KINDS, FlatIndex, top_k_rows
+
+
+def synthetic_vectors(n, dim=384, clusters=256, seed=0):
+    """Clustered unit vectors, closer to real clause embeddings than uniform noise"""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((clusters, dim)).astype(np.float32)
+    vectors = centers[rng.integers(clusters, size=n)] + 0.5 * rng.standard_normal((n, dim)).astype(np.float32)
+    return normalize_rows(vectors)
+
+
+def recall(found, truth):
+    return float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--corpus", default=DEFAULT_CORPUS_PATH)
+    parser.add_argument("--synthetic", type=int, default=0, help="use N random vectors instead of the corpus")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--rescore", type=int, default=100)
+    parser.add_argument("--dims", type=int, default=128, help="reduced dimensions for pca / prefix")
+    args = parser.parse_args()
+
+    if args.synthetic or not os.path.exists(args.corpus):
+        vectors = synthetic_vectors(args.synthetic or 100_000)
+    else:
+        vectors = open_corpus(args.corpus).vectors
+    rng = np.random.default_rng(1)
+    # Queries are perturbed corpus vectors, so each one has genuine near neighbours
+    queries = normalize_rows(
+        vectors[rng.choice(len(vectors), size=args.queries)] + 0.1 * rng.standard_normal((args.queries, vectors.shape[1]))
+    )
+
+    flat = FlatIndex(vectors)
+    start = time.perf_counter()
+    _, truth = flat.search(queries, args.top_k)
+    flat_ms = (time.perf_counter() - start) * 1000 / len(queries)
+    full_mb = vectors.shape[0] * vectors.shape[1] * 4 / 1e6
+    print(f"{len(vectors)} vectors x {vectors.shape[1]} dims, {len(queries)} queries, top_k={args.top_k}")
+    print(f"{'encoding':<10}{'MB':>10}{'ratio':>8}{'ms/query':>10}{'recall phase1':>15}{'recall rescored':>17}")
+    print(f"{'float32':<10}{full_mb:>10.1f}{1:>8.1f}{flat_ms:>10.2f}{1:>15.3f}{1:>17.3f}")
+
+    for encoding in ENCODINGS + REDUCED_KINDS:
+        if encoding in REDUCED_KINDS:
+            index = ReducedIndex.build(vectors, encoding, dims=args.dims, rescore=args.rescore)
+            coarse = index.projection.transform(queries) @ index.reduced.T
+        else:
+            index = QuantizedIndex.build(vectors, encoding, rescore=args.rescore)
+            coarse = approximate_scores(index.codes, index.scales, encoding, queries, vectors.shape[1])
+        phase1, _ = top_k_rows(coarse, args.top_k)
+        start = time.perf_counter()
+        _, ids = index.search(queries, args.top_k)
+        ms = (time.perf_counter() - start) * 1000 / len(queries)
+        mb = index.nbytes / 1e6
+        print(f"{encoding:<10}{mb:>10.1f}{full_mb / mb:>8.1f}{ms:>10.2f}"
+              f"{recall(phase1, truth):>15.3f}{recall(ids, truth):>17.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# =========================
+# Benchmark — cold import time of the core evaluation path
+# =========================
+#
+#   python bench_startup.py                # fails (exit 1) above the default budget
+#   python bench_startup.py --budget 0.5 --runs 10
+#
+# Each run imports the core modules in a fresh interpreter. The check fails if
+# the median import time exceeds the budget, or if importing them pulled in a
+# deferred heavy dependency (torch, transformers, sentence_transformers).
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+CORE_MODULES = [
+    "compliance_scoring", "rulebook", "fleet_evaluator", "corpus_store", "vector_index",
+    "chunking", "html_stream", "async_fetcher", "summary_cache", "generation_cache", "embedding_cache",
+    "model_client", "model_registry", "encoding_pool", "incremental_monitor",
+]
+DEFERRED_MODULES = ["torch", "transformers", "sentence_transformers"]
+DEFAULT_BUDGET = 1.0  # seconds
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+for name in {modules!r}:
+    __import__(name)
+elapsed = time.perf_counter() - start
+print(json.dumps({{"seconds": elapsed, "loaded": [m for m in {deferred!r} if m in sys.modules]}}))
+"""
+
+
+def cold_import(modules=CORE_MODULES):
+    code = PROBE.format(modules=list(modules), deferred=DEFERRED_MODULES)
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    return json.loads(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(modules=CORE_MODULES, top=10):
+    """(microseconds, module) of the slowest cumulative imports, from -X importtime"""
+    code = "".join(f"import {name}\n" for name in modules)
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code], capture_output=True, text=True)
+    rows = []
+    for line in out.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        rows.append((int(cumulative), name))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--budget", type=float, default=DEFAULT_BUDGET, help="seconds")
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    runs = [cold_import() for _ in range(args.runs)]
+    median = statistics.median(r["seconds"] for r in runs)
+    loaded = sorted({m for r in runs for m in r["loaded"]})
+    print(f"Cold import of {len(CORE_MODULES)} core modules: median {median:.3f}s over {args.runs} runs "
+          f"(budget {args.budget:.3f}s)")
+    print("Slowest imports (cumulative):")
+    for micros, name in slowest_imports():
+        print(f"  {micros / 1000:8.1f} ms  {name}")
+
+    failures = []
+    if median > args.budget:
+        failures.append(f"median {median:.3f}s exceeds the {args.budget:.3f}s budget")
+    if loaded:
+        failures.append(f"deferred modules imported at startup: {', '.join(loaded)}")
+    for failure in failures:
+        print("FAIL:", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# =========================
+# Page Chunking — token-aware overlapping windows with pooled rule scores
+# =========================
+#
+# MiniLM silently truncates its input (256 word pieces), so encoding a whole page
+# scores only its first few hundred words. Pages are instead cut into overlapping
+# windows of `max_tokens` word pieces, every window of every page is encoded in
+# one batched call, and the window scores are pooled per page:
+#   max   strongest evidence anywhere on the page
+#   mean  how much of the page is about the rule
+# Character offsets of the best window for each rule are reported alongside.
+#
+# A page is a list of paragraphs (or one string, a single paragraph). Windows are
+# cut inside each paragraph, never across two, so a paragraph's windows depend on
+# its own text only and can be reused while it is unchanged (incremental_monitor).
+# Offsets refer to the page text: its paragraphs joined by single spaces.
+
+import hashlib
+import re
+
+import numpy as np
+
+from compliance_scoring import normalize_rows
+
+DEFAULT_MAX_TOKENS = 128  # all-MiniLM-L6-v2 was trained on 128-piece inputs
+DEFAULT_OVERLAP = 32
+WORDS_PER_TOKEN = 0.75   # whitespace fallback: word pieces per word is ~1.3 for English
+PARAGRAPH_SEPARATOR = " "
+
+
+def page_paragraphs(page):
+    """Paragraphs of a page given as a list of paragraphs or as one string"""
+    if page is None:
+        return []
+    return [page] if isinstance(page, str) else list(page)
+
+
+def page_text(page):
+    """The text chunk offsets of `page` refer to"""
+    return PARAGRAPH_SEPARATOR.join(page_paragraphs(page))
+
+
+def paragraph_key(paragraph):
+    return hashlib.blake2b(paragraph.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def token_spans(text, tokenizer=None):
+    """(start, end) character span of every token; whitespace words without a fast tokenizer"""
+    if tokenizer is not None and getattr(tokenizer, "is_fast", False):
+        encoded = tokenizer(text, add_special_tokens=False, return_offsets_mapping=True, verbose=False)
+        return [tuple(span) for span in encoded["offset_mapping"]]
+    return [m.span() for m in re.finditer(r"\S+", text)]
+
+
+def chunk_spans(text, tokenizer=None, max_tokens=DEFAULT_MAX_TOKENS, overlap=DEFAULT_OVERLAP):
+    """Character (start, end) of overlapping windows covering the whole text.
+
+    Windows advance by `max_tokens - overlap` tokens, so a text of n tokens needs
+    about n / (max_tokens - overlap) windows; callers bound the cost by bounding
+    the text (e.g. an extraction character budget), never by skipping parts of it.
+    """
+    spans = token_spans(text, tokenizer)
+    if not spans:
+        return []
+    if tokenizer is None or not getattr(tokenizer, "is_fast", False):
+        max_tokens = max(1, int(max_tokens * WORDS_PER_TOKEN))
+        overlap = int(overlap * WORDS_PER_TOKEN)
+    stride = max(1, max_tokens - overlap)
+    starts = range(0, max(1, len(spans) - overlap), stride)
+    return [(spans[s][0], spans[min(s + max_tokens, len(spans)) - 1][1]) for s in starts]
+
+
+def encode_paragraphs(embedder, paragraphs, max_tokens=DEFAULT_MAX_TOKENS, overlap=DEFAULT_OVERLAP,
+                      batch_size=64, known=None):
+    """Window spans and normalized window embeddings of every distinct paragraph.
+
+    Returns {paragraph_key: (spans, embeddings)} for exactly the given paragraphs.
+    Paragraphs found in `known` (an earlier result) are reused; the windows of all
+    others are encoded in one batched call.
+    """
+    tokenizer = getattr(embedder, "tokenizer", None)
+    seq_limit = getattr(embedder, "max_seq_length", None)
+    if seq_limit:
+        max_tokens = min(max_tokens, seq_limit - 2)  # [CLS] and [SEP]
+    known = known or {}
+    windows, pending, texts = {}, [], []
+    for paragraph in paragraphs:
+        key = paragraph_key(paragraph)
+        if key in windows:
+            continue
+        if key in known:
+            windows[key] = known[key]
+            continue
+        spans = chunk_spans(paragraph, tokenizer, max_tokens, overlap)
+        windows[key] = (spans, None)
+        pending.append((key, spans))
+        texts.extend(paragraph[start:end] for start, end in spans)
+    if texts:
+        encoded = normalize_rows(embedder.encode(texts, convert_to_numpy=True, batch_size=batch_size))
+        row = 0
+        for key, spans in pending:
+            # Copies, so a cached paragraph does not keep its whole batch alive
+            windows[key] = (spans, encoded[row:row + len(spans)].copy())
+            row += len(spans)
+    return windows
+
+
+def page_chunks(pages, windows):
+    """(owners, offsets, embeddings) of every window of every page from encode_paragraphs output"""
+    owners, offsets, rows = [], [], []
+    for key, page in pages.items():
+        base = 0
+        for paragraph in page_paragraphs(page):
+            spans, embeddings = windows[paragraph_key(paragraph)]
+            for (start, end), embedding in zip(spans, embeddings if embeddings is not None else []):
+                owners.append(key)
+                offsets.append((base + start, base + end))
+                rows.append(embedding)
+            base += len(paragraph) + len(PARAGRAPH_SEPARATOR)
+    return owners, offsets, (np.stack(rows) if rows else None)
+
+
+def encode_chunks(embedder, pages, max_tokens=DEFAULT_MAX_TOKENS, overlap=DEFAULT_OVERLAP, batch_size=64):
+    """Chunk every page of {key: paragraphs or text} and encode all chunks in one batched call.
+
+    Returns (owners, offsets, embeddings): the page key and (start, end) in the page
+    text of each chunk, plus its normalized embedding row.
+    """
+    paragraphs = [p for page in pages.values() for p in page_paragraphs(page)]
+    windows = encode_paragraphs(embedder, paragraphs, max_tokens, overlap, batch_size)
+    return page_chunks(pages, windows)
+
+
+def pool_hits(owners, offsets, scores, ids, top_k=3):
+    """Merge per-chunk search hits into per-page top-k: {key: [(id, score, (start, end)), ...]}.
+
+    A corpus entry hit by several chunks of a page keeps its best score and chunk.
+    """
+    best = {}
+    for owner, span, row_scores, row_ids in zip(owners, offsets, scores, ids):
+        page = best.setdefault(owner, {})
+        for score, hit in zip(row_scores.tolist(), row_ids.tolist()):
+            if hit >= 0 and score > page.get(hit, (-np.inf,))[0]:
+                page[hit] = (score, span)
+    return {
+        owner: [(hit, score, span) for hit, (score, span) in sorted(page.items(), key=lambda kv: -kv[1][0])[:top_k]]
+        for owner, page in best.items()
+    }
+
+
+def score_pages(embedder, pages, rule_embeddings, max_tokens=DEFAULT_MAX_TOKENS, overlap=DEFAULT_OVERLAP,
+                batch_size=64):
+    """Pooled rule scores for many pages from a single batched encode of all their chunks.
+
+    `pages` is {key: paragraphs or text}; returns {key: {"max_scores", "mean_scores", "best_offsets", "chunks"}},
+    where scores are arrays over the rules and best_offsets[r] is the (start, end) of
+    the chunk that matched rule r best (None for pages without text).
+    """
+    owners, offsets, embeddings = encode_chunks(embedder, pages, max_tokens, overlap, batch_size)
+    return pool_scores(pages, owners, offsets, embeddings, rule_embeddings)
+
+
+def pool_scores(pages, owners, offsets, embeddings, rule_embeddings):
+    """Per-page pooled rule scores from encode_chunks output (see score_pages)"""
+    rule_embeddings = normalize_rows(rule_embeddings)
+    if embeddings is not None:
+        scores = embeddings @ rule_embeddings.T
+    else:
+        scores = np.zeros((0, len(rule_embeddings)), dtype=np.float32)
+
+    rows_by_page = {}
+    for row, owner in enumerate(owners):
+        rows_by_page.setdefault(owner, []).append(row)
+    results = {}
+    for key in pages:
+        rows = np.array(rows_by_page.get(key, []), dtype=np.int64)
+        if not len(rows):
+            empty = np.zeros(len(rule_embeddings), dtype=np.float32)
+            results[key] = {"max_scores": empty, "mean_scores": empty,
+                            "best_offsets": [None] * len(rule_embeddings), "chunks": 0}
+            continue
+        page_scores = scores[rows]
+        best = rows[np.argmax(page_scores, axis=0)]
+        results[key] = {
+            "max_scores": page_scores.max(axis=0),
+            "mean_scores": page_scores.mean(axis=0),
+            "best_offsets": [offsets[i] for i in best],
+            "chunks": len(rows),
+        }
+    return results
@@ -0,0 +1,53 @@
+# =========================
+# Compliance Scoring Engine — rule × paragraph similarity matrix
+# =========================
+
+import numpy as np
+
+# Risk buckets, indexed by how many thresholds a similarity clears
+RISK_LEVELS = np.array(["Low", "Medium", "High"])
+HIGH_RISK_MARGIN = 0.2
+
+
+def to_numpy(embeddings):
+    """Return embeddings as a float32 numpy array (accepts torch tensors)"""
+    if hasattr(embeddings, "detach"):
+        embeddings = embeddings.detach().cpu().numpy()
+    return np.asarray(embeddings, dtype=np.float32)
+
+
+def normalize_rows(embeddings):
+    """L2-normalize each row so that dot products are cosine similarities"""
+    embeddings = to_numpy(embeddings)
+    if embeddings.ndim == 1:
+        embeddings = embeddings[None, :]
+    norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return embeddings / np.maximum(norms, 1e-12)
+
+
+def similarity_matrix(rule_embeddings, para_embeddings):
+    """Cosine similarity of every rule against every paragraph, shape (rules, paragraphs)"""
+    return normalize_rows(rule_embeddings) @ normalize_rows(para_embeddings).T
+
+
+def risk_levels(similarity, thresholds):
+    """Vectorized calculate_risk: High >= threshold + 0.2, Medium >= threshold, else Low"""
+    thresholds = np.asarray(thresholds, dtype=np.float32)[:, None]
+    bucket = (similarity >= thresholds).astype(np.int8) + (similarity >= thresholds + HIGH_RISK_MARGIN)
+    return RISK_LEVELS[bucket]
+
+
+def missing_actionable(similarity, thresholds):
+    """'Yes' wherever a paragraph falls below the rule threshold"""
+    thresholds = np.asarray(thresholds, dtype=np.float32)[:, None]
+    return np.where(similarity < thresholds, "Yes", "No")
+
+
+def score_document(rule_embeddings, para_embeddings, thresholds):
+    """Score one document against all rules in a single matrix multiply"""
+    similarity = similarity_matrix(rule_embeddings, para_embeddings)
+    return {
+        "similarity": similarity,
+        "risk_level": risk_levels(similarity, thresholds),
+        "missing_actionable": missing_actionable(similarity, thresholds),
+    }
@@ -0,0 +1,246 @@
+# =========================
+# Corpus Store — one versioned file holding clause texts and their embeddings
+# =========================
+#
+# Layout (all sections 64-byte aligned):
+#   [0, HEADER_SIZE)  magic b"CLAUSEDB", then a JSON header padded with spaces
+#   vectors           count × dim array of `dtype`, opened with np.memmap (zero copy)
+#   offsets           count + 1 uint64 byte offsets into the text blob
+#   text              UTF-8 clause texts, concatenated
+#   ids (optional)    count uint64 stable clause ids (used by segmented corpora)
+#
+# The header records model id, dimension, dtype, count, section offsets, whether
+# every vector is unit-length ("normalized") and a blake2b checksum of the sections. Texts and vectors live in the same
+# file, so they cannot drift apart.
+
+import hashlib
+import json
+import os
+
+import numpy as np
+
+MAGIC = b"CLAUSEDB"
+FORMAT_VERSION = 1
+HEADER_SIZE = 4096
+ALIGNMENT = 64
+NORM_TOLERANCE = 1e-3  # |norm - 1| below this counts as normalized
+DEFAULT_CORPUS_PATH = "data/processed/clauses.corpus"
+
+
+def _align(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def _as_bytes(section):
+    return np.ascontiguousarray(section).reshape(-1).view(np.uint8)
+
+
+def _checksum(*sections):
+    digest = hashlib.blake2b(digest_size=16)
+    for section in sections:
+        digest.update(_as_bytes(section))
+    return digest.hexdigest()
+
+
+class CorpusWriter:
+    """Writes a corpus file whose vectors arrive in row order, e.g. shard by shard from an encoding pool.
+
+    Texts (and ids) are known up front, so the layout is fixed before the first
+    vector; vectors are streamed to disk and checksummed as they are written.
+    The file appears at `path` only after close() (atomic replace).
+    """
+
+    def __init__(self, path, texts, dim, model_id, dtype="float32", ids=None):
+        encoded = [str(t).encode("utf-8") for t in texts]
+        self.offsets = np.zeros(len(encoded) + 1, dtype=np.uint64)
+        self.offsets[1:] = np.cumsum([len(b) for b in encoded], dtype=np.uint64)
+        self.blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+        self.ids = None
+        if ids is not None:
+            self.ids = np.ascontiguousarray(ids, dtype=np.uint64)
+            if len(self.ids) != len(encoded):
+                raise ValueError(f"Need one id per text: {len(encoded)} texts, {len(self.ids)} ids")
+
+        self.dtype = np.dtype(dtype)
+        vectors_offset = HEADER_SIZE
+        offsets_offset = _align(vectors_offset + len(encoded) * int(dim) * self.dtype.itemsize)
+        text_offset = _align(offsets_offset + self.offsets.nbytes)
+        self.header = {
+            "format_version": FORMAT_VERSION,
+            "model_id": model_id,
+            "count": len(encoded),
+            "dim": int(dim),
+            "dtype": self.dtype.name,
+            "vectors_offset": vectors_offset,
+            "offsets_offset": offsets_offset,
+            "text_offset": text_offset,
+            "text_bytes": int(self.blob.nbytes),
+        }
+        if self.ids is not None:
+            self.header["ids_offset"] = _align(text_offset + self.blob.nbytes)
+
+        self.path = path
+        self.rows = 0
+        self._normalized = True
+        self._digest = hashlib.blake2b(digest_size=16)
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._tmp_path = path + ".tmp"
+        self._file = open(self._tmp_path, "wb")
+        self._file.seek(vectors_offset)
+
+    def write(self, vectors):
+        """Append the next rows of vectors"""
+        if hasattr(vectors, "detach"):
+            vectors = vectors.detach().cpu().numpy()
+        vectors = np.ascontiguousarray(vectors, dtype=self.dtype)
+        if vectors.ndim != 2 or vectors.shape[1] != self.header["dim"]:
+            raise ValueError(f"Expected vectors of dimension {self.header['dim']}, got shape {vectors.shape}")
+        if self.rows + len(vectors) > self.header["count"]:
+            raise ValueError(f"More vectors than texts: {self.rows + len(vectors)} > {self.header['count']}")
+        data = _as_bytes(vectors)
+        self._file.write(data)
+        self._digest.update(data)
+        self.rows += len(vectors)
+        norms = np.linalg.norm(vectors.astype(np.float32), axis=1)
+        self._normalized = self._normalized and bool(np.all(np.abs(norms - 1) < NORM_TOLERANCE))
+
+    def close(self):
+        """Write the remaining sections and header, then move the file into place"""
+        if self.rows != self.header["count"]:
+            raise ValueError(f"Need one vector per text: {self.header['count']} texts, {self.rows} vectors written")
+        layout = [(self.header["offsets_offset"], self.offsets), (self.header["text_offset"], self.blob)]
+        if self.ids is not None:
+            layout.append((self.header["ids_offset"], self.ids))
+        for offset, section in layout:
+            self._digest.update(_as_bytes(section))
+        self.header["normalized"] = self._normalized
+        self.header["checksum"] = self._digest.hexdigest()
+        header_bytes = MAGIC + json.dumps(self.header).encode("utf-8")
+        if len(header_bytes) > HEADER_SIZE:
+            raise ValueError("Corpus header too large")
+
+        for offset, section in layout:
+            self._file.seek(offset)
+            self._file.write(_as_bytes(section))
+        self._file.seek(0)
+        self._file.write(header_bytes.ljust(HEADER_SIZE, b" "))
+        self._file.close()
+        os.replace(self._tmp_path, self.path)
+        return self.header
+
+    def abort(self):
+        self._file.close()
+        if os.path.exists(self._tmp_path):
+            os.remove(self._tmp_path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is not None:
+            self.abort()
+            return
+        try:
+            self.close()
+        except Exception:
+            self.abort()
+            raise
+
+
+def write_corpus(path, texts, vectors, model_id, dtype="float32", ids=None):
+    """Write texts + vectors (+ optional clause ids) as a single corpus file (atomically replaces `path`)"""
+    if hasattr(vectors, "detach"):
+        vectors = vectors.detach().cpu().numpy()
+    vectors = np.ascontiguousarray(vectors, dtype=dtype)
+    if vectors.ndim != 2 or len(vectors) != len(texts):
+        raise ValueError(f"Need one vector per text: {len(texts)} texts, vectors of shape {vectors.shape}")
+    with CorpusWriter(path, texts, vectors.shape[1], model_id, dtype, ids) as writer:
+        writer.write(vectors)
+    return writer.header
+
+
+def read_header(path):
+    with open(path, "rb") as f:
+        raw = f.read(HEADER_SIZE)
+    if not raw.startswith(MAGIC):
+        raise ValueError(f"{path} is not a corpus file")
+    header = json.loads(raw[len(MAGIC):].decode("utf-8"))
+    if header["format_version"] != FORMAT_VERSION:
+        raise ValueError(f"{path} has corpus format {header['format_version']}, expected {FORMAT_VERSION}")
+    return header
+
+
+class ClauseTexts:
+    """Read-only sequence of clause texts decoded on access from the text blob"""
+
+    def __init__(self, offsets, blob):
+        self._offsets = offsets
+        self._blob = blob
+
+    def __len__(self):
+        return len(self._offsets) - 1
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self)))]
+        i = int(i)
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return bytes(self._blob[self._offsets[i]:self._offsets[i + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class CorpusStore:
+    """Memory-mapped view of a corpus file; opening it costs O(1) in corpus size"""
+
+    def __init__(self, path=DEFAULT_CORPUS_PATH, model_id=None):
+        self.path = path
+        self.header = read_header(path)
+        if model_id is not None and self.header["model_id"] != model_id:
+            raise ValueError(f"{path} was built with {self.header['model_id']}, not {model_id}")
+        count, dim = self.header["count"], self.header["dim"]
+        self.vectors = np.memmap(path, dtype=self.header["dtype"], mode="r",
+                                 offset=self.header["vectors_offset"], shape=(count, dim))
+        self.offsets = np.memmap(path, dtype=np.uint64, mode="r",
+                                 offset=self.header["offsets_offset"], shape=(count + 1,))
+        if self.header["text_bytes"]:
+            self.blob = np.memmap(path, dtype=np.uint8, mode="r",
+                                  offset=self.header["text_offset"], shape=(self.header["text_bytes"],))
+        else:
+            self.blob = np.zeros(0, dtype=np.uint8)
+        self.texts = ClauseTexts(self.offsets, self.blob)
+        self.ids = None
+        if "ids_offset" in self.header:
+            if count:
+                self.ids = np.memmap(path, dtype=np.uint64, mode="r",
+                                     offset=self.header["ids_offset"], shape=(count,))
+            else:
+                self.ids = np.zeros(0, dtype=np.uint64)
+
+    @property
+    def model_id(self):
+        return self.header["model_id"]
+
+    @property
+    def normalized(self):
+        """True when every vector is unit-length, so the memmap can be searched without a normalized copy"""
+        return self.header.get("normalized", False)
+
+    def __len__(self):
+        return self.header["count"]
+
+    def verify(self):
+        """Recompute the content checksum (reads the whole file)"""
+        sections = [self.vectors, self.offsets, self.blob] + ([self.ids] if self.ids is not None else [])
+        if _checksum(*sections) != self.header["checksum"]:
+            raise ValueError(f"{self.path} failed its checksum; rebuild the corpus")
+        return True
+
+
+def open_corpus(path=DEFAULT_CORPUS_PATH, model_id=None):
+    return CorpusStore(path, model_id)
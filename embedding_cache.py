@@ -0,0 +1,286 @@
+# =========================
+# Shared Embedding Cache — content-addressed, memory-mapped, LRU-bounded
+# =========================
+
+import atexit
+import contextlib
+import fcntl
+import hashlib
+import json
+import os
+import re
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+DEFAULT_CACHE_DIR = "data/cache/embeddings"
+DEFAULT_CAPACITY = 100_000  # vectors per model; 384-dim float32 => ~150 MB on disk
+BACKEND_ENV = "COMPLIANCE_EMBEDDER_BACKEND"  # "torch" (default) or "onnx", see onnx_embedder.py
+BACKENDS = ("torch", "onnx")
+
+
+def normalize_text(text):
+    """Collapse whitespace so trivially different copies of a text share one entry"""
+    return " ".join(str(text).split())
+
+
+def text_key(model_id, text):
+    """16-byte content hash of (model id, normalized text)"""
+    payload = f"{model_id}\0{normalize_text(text)}".encode("utf-8")
+    return hashlib.blake2b(payload, digest_size=16).digest()
+
+
+def cache_directory(model_id, cache_dir=DEFAULT_CACHE_DIR):
+    return os.path.join(cache_dir, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_id))
+
+
+class EmbeddingCache:
+    """Fixed-capacity vector store for one model.
+
+    Vectors live in a memory-mapped float32 file; a compact index maps each
+    16-byte text hash to its row. The index is kept in LRU order and the least
+    recently used rows are recycled once the capacity is reached.
+
+    Several processes may share a directory: reads and writes hold a file lock
+    and first reload the index if another process saved a newer one (tracked by
+    a generation counter). A row is only recycled after an index without its old
+    key has been saved, so a crash never leaves the index pointing at a vector
+    of another text. Within a process use open_cache(), one instance per directory.
+    """
+
+    def __init__(self, model_id, dim, cache_dir=DEFAULT_CACHE_DIR, capacity=DEFAULT_CAPACITY):
+        self.model_id = model_id
+        self.dim = int(dim)
+        self.capacity = int(capacity)
+        self.dir = cache_directory(model_id, cache_dir)
+        os.makedirs(self.dir, exist_ok=True)
+        self.meta_path = os.path.join(self.dir, "meta.json")
+        self.vectors_path = os.path.join(self.dir, "vectors.f32")
+        self.index_path = os.path.join(self.dir, "index.npz")
+        self.generation_path = os.path.join(self.dir, "generation")
+        self._lock = threading.RLock()
+        self._lock_file = open(os.path.join(self.dir, "lock"), "a+")
+        self._index = OrderedDict()  # key -> row, oldest first
+        self._generation = None  # generation of the index held in memory
+        self._dirty = False  # recency changed since the last save
+
+        meta = {"model_id": model_id, "dim": self.dim, "capacity": self.capacity}
+        with self._locked(fcntl.LOCK_EX):
+            reuse = os.path.exists(self.vectors_path) and self._read_meta() == meta
+            self.vectors = np.memmap(
+                self.vectors_path, dtype=np.float32, mode="r+" if reuse else "w+",
+                shape=(self.capacity, self.dim)
+            )
+            if reuse:
+                self._sync()
+                if self._generation is None:  # index saved before generations were tracked
+                    self._save_index()
+            else:
+                with open(self.meta_path, "w") as f:
+                    json.dump(meta, f)
+                self._save_index()
+        atexit.register(self.flush)
+
+    @contextlib.contextmanager
+    def _locked(self, mode):
+        with self._lock:
+            fcntl.flock(self._lock_file, mode)
+            try:
+                yield
+            finally:
+                fcntl.flock(self._lock_file, fcntl.LOCK_UN)
+
+    def _read_meta(self):
+        try:
+            with open(self.meta_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _read_generation(self):
+        try:
+            with open(self.generation_path) as f:
+                return int(f.read())
+        except (OSError, ValueError):
+            return None
+
+    def _sync(self):
+        """Reload the index if another process (or a crash) left a different one on disk"""
+        generation = self._read_generation()
+        if generation is not None and generation == self._generation:
+            return
+        self._index = OrderedDict()
+        if os.path.exists(self.index_path):
+            saved = np.load(self.index_path)
+            self._index.update(zip((k.tobytes() for k in saved["keys"]), saved["rows"].tolist()))
+        self._generation = generation
+        self._dirty = False
+
+    def _save_index(self):
+        """Persist the index atomically and bump the generation (exclusive lock held)"""
+        keys = np.frombuffer(b"".join(self._index.keys()), dtype=np.uint8).reshape(-1, 16)
+        rows = np.fromiter(self._index.values(), dtype=np.int64, count=len(self._index))
+        tmp_path = self.index_path + ".tmp.npz"
+        np.savez(tmp_path, keys=keys, rows=rows)
+        os.replace(tmp_path, self.index_path)
+        generation = (self._read_generation() or 0) + 1
+        with open(self.generation_path + ".tmp", "w") as f:
+            f.write(str(generation))
+        os.replace(self.generation_path + ".tmp", self.generation_path)
+        self._generation = generation
+        self._dirty = False
+
+    def __len__(self):
+        return len(self._index)
+
+    def get_many(self, keys):
+        """Return {key: vector} for the keys that are cached, marking them recently used"""
+        found = {}
+        with self._locked(fcntl.LOCK_SH):
+            self._sync()
+            for key in keys:
+                row = self._index.get(key)
+                if row is not None:
+                    self._index.move_to_end(key)
+                    found[key] = np.array(self.vectors[row])
+            self._dirty = self._dirty or bool(found)
+        return found
+
+    def put_many(self, keys, vectors):
+        items = dict(zip(keys, vectors))
+        with self._locked(fcntl.LOCK_EX):
+            self._sync()
+            # Keys another process cached meanwhile already hold the same vector
+            new = [key for key in items if key not in self._index][-self.capacity:]
+            if not new:
+                return
+            used = np.zeros(self.capacity, dtype=bool)
+            used[np.fromiter(self._index.values(), dtype=np.int64, count=len(self._index))] = True
+            rows = np.nonzero(~used)[0][:len(new)].tolist()
+            if len(rows) < len(new):
+                # Forget the least recently used keys on disk before their rows are overwritten
+                rows += [self._index.popitem(last=False)[1] for _ in range(len(new) - len(rows))]
+                self._save_index()
+            self.vectors[rows] = np.stack([items[key] for key in new])
+            self.vectors.flush()
+            self._index.update(zip(new, rows))
+            self._save_index()
+
+    def flush(self):
+        """Persist LRU order, unless another process saved a newer index meanwhile"""
+        if not self._dirty:
+            return
+        with self._locked(fcntl.LOCK_EX):
+            if self._read_generation() == self._generation:
+                self._save_index()
+
+
+_caches = {}  # cache directory -> EmbeddingCache shared by every embedder in this process
+_caches_lock = threading.Lock()
+
+
+def open_cache(model_id, dim, cache_dir=DEFAULT_CACHE_DIR, capacity=DEFAULT_CAPACITY):
+    """The process-wide EmbeddingCache for `model_id` in `cache_dir`"""
+    key = os.path.abspath(cache_directory(model_id, cache_dir))
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = _caches[key] = EmbeddingCache(model_id, dim, cache_dir, capacity)
+        elif (cache.dim, cache.capacity) != (int(dim), int(capacity)):
+            raise ValueError(f"{key} is open with dim {cache.dim} / capacity {cache.capacity}, "
+                             f"not {dim} / {capacity}")
+    return cache
+
+
+class CachedEmbedder:
+    """Drop-in wrapper for SentenceTransformer.encode that only encodes texts missing from the cache"""
+
+    def __init__(self, model, model_id, cache=None):
+        self.model = model
+        self.model_id = model_id
+        if cache is None:
+            cache = open_cache(model_id, model.get_sentence_embedding_dimension())
+        self.cache = cache
+
+    def __getattr__(self, name):
+        # device, tokenizer, max_seq_length, ... come from the wrapped model
+        if name == "model":
+            raise AttributeError(name)
+        return getattr(self.model, name)
+
+    def encode(self, sentences, convert_to_tensor=False, convert_to_numpy=True,
+               normalize_embeddings=False, batch_size=32, show_progress_bar=None, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        keys = [text_key(self.model_id, t) for t in texts]
+
+        found = self.cache.get_many(dict.fromkeys(keys))
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in found and key not in missing:
+                missing[key] = text
+        if missing:
+            new_vectors = self.model.encode(
+                list(missing.values()), batch_size=batch_size, show_progress_bar=show_progress_bar,
+                convert_to_numpy=True, **kwargs
+            )
+            self.cache.put_many(missing.keys(), new_vectors)
+            found.update(zip(missing.keys(), new_vectors))
+
+        if texts:
+            embeddings = np.stack([found[key] for key in keys]).astype(np.float32)
+        else:
+            embeddings = np.empty((0, self.cache.dim), dtype=np.float32)
+        if normalize_embeddings:
+            embeddings /= np.maximum(np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12)
+        if single:
+            embeddings = embeddings[0]
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(embeddings).to(self.model.device)
+        return embeddings
+
+
+def resolve_backend(backend=None):
+    """`backend`, else COMPLIANCE_EMBEDDER_BACKEND, else 'torch'"""
+    backend = backend or os.environ.get(BACKEND_ENV) or "torch"
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown embedder backend {backend!r}; expected one of {BACKENDS}")
+    return backend
+
+
+def backend_model_id(model_name, backend):
+    """Id of the vectors a backend produces: int8 ONNX vectors are not the fp32 ones"""
+    return model_name if backend == "torch" else f"{model_name}@onnx-int8"
+
+
+def get_embedder(model_name="all-MiniLM-L6-v2", device=None, cache_dir=DEFAULT_CACHE_DIR,
+                 capacity=DEFAULT_CAPACITY, remote=True, backend=None, cached=True):
+    """SentenceTransformer wrapped with the shared on-disk embedding cache.
+
+    With COMPLIANCE_MODEL_SERVER set (and `remote`), the model stays on the model
+    server and only cache misses are sent there. `backend` "onnx" runs the int8
+    ONNX export on CPU instead of eager PyTorch (default: COMPLIANCE_EMBEDDER_BACKEND
+    or "torch"), also on the model server; its vectors are cached separately
+    from the fp32 ones. `cached` False returns the bare model (the model server
+    caches nothing itself).
+    """
+    from model_client import ModelClient, RemoteEmbedder, server_url
+    backend = resolve_backend(backend)
+    model_id = model_name
+    if remote and server_url():
+        # Keyed on the backend the server reports, which produced the vectors
+        model = RemoteEmbedder(model_name, ModelClient(), backend=backend)
+        model_id = backend_model_id(model_name, model.backend)
+    elif backend == "onnx":
+        from onnx_embedder import load_onnx_embedder
+        model = load_onnx_embedder(model_name)
+        model_id = backend_model_id(model_name, backend)
+    else:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(model_name, device=device)
+    if not cached:
+        return model
+    cache = open_cache(model_id, model.get_sentence_embedding_dimension(), cache_dir, capacity)
+    return CachedEmbedder(model, model_id, cache)
@@ -0,0 +1,200 @@
+# =========================
+# Encoding Pool — multi-process CPU embedding for corpus builds
+# =========================
+#
+# A single SentenceTransformer process leaves most cores of a CPU node idle on
+# large regulatory dumps. Here texts are cut into fixed-size shards and encoded
+# by a pool of worker processes, each loading its own model copy with a capped
+# number of torch / BLAS threads (workers x threads ~ cores, no oversubscription).
+# The OpenMP / BLAS caps are environment variables read when a library loads, so
+# they are set in the parent while it spawns the workers (numpy is imported in a
+# worker before any initializer runs). The worker runs the embedder backend the
+# scripts use (COMPLIANCE_EMBEDDER_BACKEND, see embedding_cache.py).
+#
+# Every finished shard is saved under `work_dir` before it is used, and shards
+# are streamed into the corpus file (corpus_store.CorpusWriter) in text order as
+# soon as all earlier ones are done. If the build crashes, rerunning it with the
+# same texts and model reuses the saved shards and only encodes the rest.
+#
+# Workers are started with "spawn" (forking a process that already holds torch
+# threads is unsafe); from a plain script, call it under `if __name__ == "__main__":`.
+
+import contextlib
+import functools
+import hashlib
+import multiprocessing
+import os
+import shutil
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+
+from compliance_scoring import normalize_rows
+from corpus_store import CorpusWriter
+from embedding_cache import backend_model_id, resolve_backend
+from onnx_embedder import ensure_exported, load_onnx_embedder
+
+DEFAULT_SHARD_SIZE = 2048  # texts per shard
+DEFAULT_WORK_DIR = "data/cache/encoding_shards"
+THREAD_ENV_VARS = ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS")
+
+_model = None  # per worker process
+
+
+def load_sentence_transformer(model_name):
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(model_name, device="cpu")
+
+
+@contextlib.contextmanager
+def worker_thread_limits(threads):
+    """Thread caps in the environment while worker processes are spawned (they inherit it)"""
+    caps = {var: str(threads) for var in THREAD_ENV_VARS}
+    caps["TOKENIZERS_PARALLELISM"] = "false"
+    saved = {var: os.environ.get(var) for var in caps}
+    os.environ.update(caps)
+    try:
+        yield
+    finally:
+        for var, value in saved.items():
+            if value is None:
+                os.environ.pop(var, None)
+            else:
+                os.environ[var] = value
+
+
+def _init_worker(model_name, threads, loader):
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        torch.set_num_interop_threads(1)
+    except ImportError:
+        pass
+    global _model
+    _model = loader(model_name)
+
+
+def _encode_shard(shard, texts, path, batch_size):
+    start = time.perf_counter()
+    vectors = np.asarray(_model.encode(texts, batch_size=batch_size, convert_to_numpy=True), dtype=np.float32)
+    tmp_path = path + ".tmp.npy"
+    np.save(tmp_path, vectors)
+    os.replace(tmp_path, path)
+    return shard, os.getpid(), len(texts), time.perf_counter() - start
+
+
+def shard_fingerprint(texts, model_id, shard_size):
+    """Names the shard directory: saved shards are only reused for the same texts, model (and backend) and sharding"""
+    digest = hashlib.blake2b(f"{model_id}\0{shard_size}".encode("utf-8"), digest_size=16)
+    for text in texts:
+        digest.update(str(text).encode("utf-8") + b"\0")
+    return digest.hexdigest()
+
+
+class EncodingPool:
+    """Encodes texts across `workers` CPU processes, each limited to `threads_per_worker` threads.
+
+    `backend` is "torch" or "onnx" (default: COMPLIANCE_EMBEDDER_BACKEND or "torch");
+    a custom `loader(model_name)` replaces the backend's loader.
+    """
+
+    def __init__(self, model_name="all-MiniLM-L6-v2", workers=None, threads_per_worker=None,
+                 shard_size=DEFAULT_SHARD_SIZE, batch_size=64, work_dir=DEFAULT_WORK_DIR,
+                 loader=None, backend=None):
+        cores = os.cpu_count() or 1
+        self.model_name = model_name
+        self.backend = resolve_backend(backend)
+        self.model_id = backend_model_id(model_name, self.backend)
+        self.workers = max(1, workers or cores)
+        self.threads_per_worker = threads_per_worker or max(1, cores // self.workers)
+        self.shard_size = shard_size
+        self.batch_size = batch_size
+        self.work_dir = work_dir
+        self.loader = loader
+        self.stats = {}
+
+    def _worker_loader(self):
+        if self.loader is not None:
+            return self.loader
+        if self.backend == "onnx":
+            # Exported once here, not by every worker at the same time
+            ensure_exported(self.model_name)
+            return functools.partial(load_onnx_embedder, threads=self.threads_per_worker)
+        return load_sentence_transformer
+
+    def build_corpus(self, path, texts, model_id=None, ids=None, normalize=False):
+        """Encode `texts` and write them as a corpus file at `path`; returns its header.
+
+        With `normalize`, vectors are L2-normalized before they are written (as
+        segmented corpora store them). Per-worker throughput of the run is left
+        in `self.stats` (see report()).
+        """
+        texts = list(texts)
+        model_id = model_id or self.model_id
+        shard_dir = os.path.join(self.work_dir, shard_fingerprint(texts, self.model_id, self.shard_size))
+        os.makedirs(shard_dir, exist_ok=True)
+        starts = range(0, len(texts), self.shard_size)
+        paths = [os.path.join(shard_dir, f"shard-{i:06d}.npy") for i in range(len(starts))]
+        pending = [i for i, p in enumerate(paths) if not os.path.exists(p)]
+        self.stats = {"shards": len(paths), "resumed": len(paths) - len(pending), "workers": {}, "seconds": 0.0}
+
+        started = time.perf_counter()
+        done = set(range(len(paths))) - set(pending)
+        writer = None
+        next_shard = 0
+        loader = self._worker_loader() if pending else None
+        with ProcessPoolExecutor(
+            max_workers=min(self.workers, len(pending)) or 1,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(self.model_name, self.threads_per_worker, loader),
+        ) as pool:
+            # Spawn workers start on submit and inherit the capped environment
+            with worker_thread_limits(self.threads_per_worker):
+                futures = {pool.submit(_encode_shard, i, texts[starts[i]:starts[i] + self.shard_size],
+                                       paths[i], self.batch_size) for i in pending}
+            try:
+                while True:
+                    # Stream every shard whose predecessors are all written
+                    while next_shard in done:
+                        vectors = np.load(paths[next_shard])
+                        if normalize:
+                            vectors = normalize_rows(vectors)
+                        if writer is None:
+                            writer = CorpusWriter(path, texts, vectors.shape[1], model_id, ids=ids)
+                        writer.write(vectors)
+                        next_shard += 1
+                    if not futures:
+                        break
+                    finished, futures = wait(futures, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        shard, pid, count, seconds = future.result()
+                        done.add(shard)
+                        worker = self.stats["workers"].setdefault(pid, {"shards": 0, "texts": 0, "seconds": 0.0})
+                        worker["shards"] += 1
+                        worker["texts"] += count
+                        worker["seconds"] += seconds
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+                if writer is not None:
+                    writer.abort()
+                raise
+
+        if writer is None:  # no texts: nothing to infer the dimension from
+            writer = CorpusWriter(path, texts, 0, model_id, ids=ids)
+        header = writer.close()
+        shutil.rmtree(shard_dir, ignore_errors=True)
+        self.stats["seconds"] = time.perf_counter() - started
+        return header
+
+    def report(self):
+        """Human-readable per-worker throughput of the last build"""
+        stats = self.stats
+        lines = [f"Encoded {stats['shards'] - stats['resumed']} of {stats['shards']} shards "
+                 f"({stats['resumed']} resumed) in {stats['seconds']:.1f}s"]
+        for pid, worker in sorted(stats["workers"].items()):
+            rate = worker["texts"] / worker["seconds"] if worker["seconds"] else 0.0
+            lines.append(f"  worker {pid}: {worker['shards']} shards, {worker['texts']} texts, {rate:.0f} texts/s")
+        return "\n".join(lines)
@@ -0,0 +1,64 @@
+# =========================
+# Fleet Evaluator — score every application × rule in one array operation
+# =========================
+
+import numpy as np
+import pandas as pd
+
+COMPLIANCE_THRESHOLD = 0.4
+
+
+def metrics_table(applications, rule_keys=None):
+    """Columnar apps × metrics table from the {app_name: {metric: value}} dict"""
+    # from_dict drops apps with no metrics at all; they still need a (compliant) report.
+    # object dtype keeps 30 as 30 (not 30.0) when some app lacks the metric, so
+    # values stringify exactly as the rulebook compiled them
+    table = pd.DataFrame.from_dict(applications, orient="index", dtype=object).reindex(list(applications))
+    if rule_keys is not None:
+        table = table.reindex(columns=list(rule_keys))
+    return table
+
+
+def evaluate_fleet(rulebook, table, threshold=COMPLIANCE_THRESHOLD):
+    """Score all apps against all rulebook rules with a single gather from the rule × value table.
+
+    Returns a dict of aligned arrays: `scores` (apps × rules, NaN where the metric is
+    absent), `present` and `alerts` boolean masks, plus the app and rule labels.
+    """
+    rule_keys = [key for key in rulebook.rule_keys if key in table.columns]
+    rule_ids = np.array([rulebook.rule_index[key] for key in rule_keys], dtype=np.int64)
+
+    columns = table[rule_keys]
+    present = columns.notna().to_numpy()
+    value_ids = np.zeros(columns.shape, dtype=np.int64)
+    for j, key in enumerate(rule_keys):
+        column = columns[key][present[:, j]].astype(str)
+        codes = column.map(rulebook.value_index)
+        if codes.isna().any():
+            unknown = sorted(set(column[codes.isna()]))
+            raise KeyError(f"Metric values {unknown} for '{key}' are not in the rulebook; recompile with them")
+        value_ids[present[:, j], j] = codes.to_numpy(dtype=np.int64)
+
+    scores = np.where(present, rulebook.scores[rule_ids[None, :], value_ids], np.nan)
+    return {
+        "apps": list(table.index),
+        "rule_keys": rule_keys,
+        "values": columns.to_numpy(dtype=object),
+        "scores": scores,
+        "present": present,
+        "alerts": present & (scores < threshold),
+    }
+
+
+def build_reports(result, rulebook):
+    """Per-app reports (alerts + suggested_changes) generated from the result arrays"""
+    reports = {app: {"app_name": app, "alerts": [], "suggested_changes": []} for app in result["apps"]}
+    rules = rulebook.rules()
+    for i, j in zip(*np.nonzero(result["alerts"])):
+        app, key = result["apps"][i], result["rule_keys"][j]
+        metric_value, score, rule_text = result["values"][i, j], result["scores"][i, j], rules[key]
+        reports[app]["alerts"].append(
+            f"⚠ Non-compliance on {key}: value='{metric_value}' vs rule='{rule_text}' (score={score:.2f})"
+        )
+        reports[app]["suggested_changes"].append(f"Change '{key}' of {app} to comply with: '{rule_text}'")
+    return reports
@@ -0,0 +1,113 @@
+# =========================
+# Functional Probes — concurrent, deduplicated DNS and TLS checks with TTL caching
+# =========================
+
+import asyncio
+import socket
+import ssl
+import time
+from urllib.parse import urlsplit
+
+from async_fetcher import run_coroutine
+
+ACCEPTED_TLS_VERSIONS = ("TLSv1.2", "TLSv1.3")
+
+
+def url_host(url):
+    """(hostname, TLS port) of a URL; bare hosts are accepted too"""
+    parts = urlsplit(url if "://" in url else "https://" + url)
+    return parts.hostname, parts.port or 443
+
+
+class TTLCache:
+    """Tiny expiring cache: values are dropped `ttl` seconds after they were stored"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            self._entries.pop(key, None)
+            return None
+        return entry[1]
+
+    def put(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+
+
+class FunctionalProber:
+    """Runs DNS and TLS probes once per host, concurrently, each under its own deadline.
+
+    Results are cached for `dns_ttl` / `tls_ttl` seconds and carry the probe latency
+    in milliseconds (`cached` is True when a result was served from the cache).
+    """
+
+    def __init__(self, dns_ttl=300, tls_ttl=3600, timeout=5, ssl_context=None):
+        self.dns_cache = TTLCache(dns_ttl)
+        self.tls_cache = TTLCache(tls_ttl)
+        self.timeout = timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+
+    async def resolve(self, hostname):
+        cached = self.dns_cache.get(hostname)
+        if cached:
+            return dict(cached, cached=True)
+        start = time.perf_counter()
+        try:
+            infos = await asyncio.wait_for(
+                asyncio.get_running_loop().getaddrinfo(hostname, None, type=socket.SOCK_STREAM),
+                self.timeout,
+            )
+            ips = list(dict.fromkeys(info[4][0] for info in infos))
+            result = {"ok": bool(ips), "ips": ips, "error": None}
+        except (OSError, asyncio.TimeoutError) as e:
+            result = {"ok": False, "ips": [], "error": str(e) or type(e).__name__}
+        result["latency_ms"] = (time.perf_counter() - start) * 1000
+        if result["ok"]:
+            self.dns_cache.put(hostname, result)
+        return dict(result, cached=False)
+
+    async def check_tls(self, hostname, port=443):
+        key = (hostname, port)
+        cached = self.tls_cache.get(key)
+        if cached:
+            return dict(cached, cached=True)
+        start = time.perf_counter()
+        writer = None
+        try:
+            _, writer = await asyncio.wait_for(
+                asyncio.open_connection(hostname, port, ssl=self.ssl_context, server_hostname=hostname),
+                self.timeout,
+            )
+            version = writer.get_extra_info("ssl_object").version()
+            result = {"ok": version in ACCEPTED_TLS_VERSIONS, "version": version, "error": None}
+        except (OSError, ssl.SSLError, asyncio.TimeoutError) as e:
+            result = {"ok": False, "version": str(e) or type(e).__name__, "error": str(e) or type(e).__name__}
+        result["latency_ms"] = (time.perf_counter() - start) * 1000
+        if writer is not None:
+            writer.close()
+            try:
+                await asyncio.wait_for(writer.wait_closed(), self.timeout)
+            except (OSError, ssl.SSLError, asyncio.TimeoutError):
+                pass  # the result is settled; a failed TLS shutdown does not change it
+        if result["error"] is None:
+            self.tls_cache.put(key, result)
+        return dict(result, cached=False)
+
+    async def probe_async(self, urls):
+        targets = {url: url_host(url) for url in urls}
+        hosts = list(dict.fromkeys(targets.values()))
+        dns_results, tls_results = await asyncio.gather(
+            asyncio.gather(*(self.resolve(host) for host, _ in hosts)),
+            asyncio.gather(*(self.check_tls(host, port) for host, port in hosts)),
+        )
+        by_host = {
+            target: {"dns": dns, "tls": tls} for target, dns, tls in zip(hosts, dns_results, tls_results)
+        }
+        return {url: by_host[target] for url, target in targets.items()}
+
+    def probe(self, urls):
+        """{url: {"dns": {...}, "tls": {...}}} with one DNS and one TLS probe per distinct host"""
+        return run_coroutine(self.probe_async(urls))
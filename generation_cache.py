@@ -0,0 +1,152 @@
+# =========================
+# Generation Cache — durable seq2seq outputs in one SQLite file (WAL mode)
+# =========================
+#
+# Summaries and action items are generated with do_sample=False, so the same
+# (model, prompt template, generation kwargs, input) always gives the same text.
+# Outputs are stored under a hash of those four parts. WAL mode lets any number
+# of readers (other scripts, notebook kernels) use the file while one process
+# writes; once the stored outputs exceed `max_bytes`, the least recently used
+# entries are evicted. Lookups only note hit times in memory: they are written
+# in the next put_many transaction (before eviction) or by flush() / close().
+
+import atexit
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+DEFAULT_CACHE_PATH = "data/cache/generations.sqlite"
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+EVICT_TO = 0.9  # evict down to this fraction of max_bytes
+SQL_CHUNK = 500  # host parameters per statement
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class GenerationCache:
+    """Persistent generation store with LRU-by-size eviction and hit/miss counters"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_bytes=DEFAULT_MAX_BYTES):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.path = path
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS generations ("
+            "key TEXT PRIMARY KEY, output TEXT NOT NULL, size INTEGER NOT NULL, last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS generations_last_used ON generations (last_used)")
+        self.conn.commit()
+        self.hits = self.misses = self.evictions = 0
+        self._touched = {}  # key -> last hit time, not yet written
+        atexit.register(self.flush)
+
+    @staticmethod
+    def make_key(text, model_id, gen_kwargs, template=""):
+        params = json.dumps(gen_kwargs, sort_keys=True, default=str)
+        return text_hash(f"{model_id}\n{template}\n{params}\n{text_hash(text)}")
+
+    def get_many(self, keys):
+        keys = list(dict.fromkeys(keys))
+        found = {}
+        with self.lock:
+            for start in range(0, len(keys), SQL_CHUNK):
+                chunk = keys[start:start + SQL_CHUNK]
+                placeholders = ",".join("?" * len(chunk))
+                found.update(self.conn.execute(
+                    f"SELECT key, output FROM generations WHERE key IN ({placeholders})", chunk
+                ))
+            now = time.time()
+            self._touched.update((key, now) for key in found)
+            self.hits += len(found)
+            self.misses += len(keys) - len(found)
+        return found
+
+    def put_many(self, items):
+        now = time.time()
+        rows = [(key, output, len(output.encode("utf-8")), now) for key, output in items]
+        with self.lock:
+            self._write_touched()
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO generations (key, output, size, last_used) VALUES (?, ?, ?, ?)", rows
+            )
+            self.conn.commit()
+            self._evict()
+
+    def _write_touched(self):
+        if self._touched:
+            self.conn.executemany("UPDATE generations SET last_used = ? WHERE key = ?",
+                                  [(used, key) for key, used in self._touched.items()])
+            self._touched = {}
+
+    def flush(self):
+        """Write the hit times noted since the last write"""
+        with self.lock:
+            if self._touched:
+                self._write_touched()
+                self.conn.commit()
+
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM generations").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - int(self.max_bytes * EVICT_TO)
+        doomed = []
+        for key, size in self.conn.execute("SELECT key, size FROM generations ORDER BY last_used"):
+            doomed.append(key)
+            excess -= size
+            if excess <= 0:
+                break
+        for start in range(0, len(doomed), SQL_CHUNK):
+            chunk = doomed[start:start + SQL_CHUNK]
+            self.conn.execute(f"DELETE FROM generations WHERE key IN ({','.join('?' * len(chunk))})", chunk)
+        self.conn.commit()
+        self.evictions += len(doomed)
+
+    def stats(self):
+        with self.lock:
+            entries, size = self.conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM generations").fetchone()
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "evictions": self.evictions, "entries": entries, "bytes": size}
+
+    def close(self):
+        self.flush()
+        atexit.unregister(self.flush)
+        self.conn.close()
+
+
+def cached_generate(cache, texts, model_id, generate, template="", **gen_kwargs):
+    """Outputs for `texts` in order, calling `generate(missing_texts, **gen_kwargs)` only for uncached distinct texts.
+
+    The kwargs that key the cache are the ones passed to `generate`. `template` is
+    the prompt the texts are formatted into before generation (part of the key).
+    """
+    texts = list(texts)
+    unique = list(dict.fromkeys(texts))
+    keys = {text: GenerationCache.make_key(text, model_id, gen_kwargs, template) for text in unique}
+    found = cache.get_many(keys.values()) if cache is not None else {}
+    outputs = {text: found[keys[text]] for text in unique if keys[text] in found}
+    missing = [text for text in unique if text not in outputs]
+    if missing:
+        generated = generate(missing, **gen_kwargs)
+        outputs.update(zip(missing, generated))
+        if cache is not None:
+            cache.put_many((keys[text], output) for text, output in zip(missing, generated))
+    return [outputs[text] for text in texts]
+
+
+def model_id_of(pipe):
+    """Model name of a transformers pipeline, RemotePipeline or registry LazyModel"""
+    name = getattr(pipe, "model_name", None)
+    if name is None:
+        name = pipe.model.name_or_path
+    return name
@@ -0,0 +1,138 @@
+# =========================
+# GeoIP Interval Index — data-residency lookups by binary search
+# =========================
+
+import ipaddress
+import os
+from functools import lru_cache
+
+import numpy as np
+
+DEFAULT_DB_PATH = "/usr/share/GeoIP/GeoLite2-Country.mmdb"
+DEFAULT_INDEX_PATH = "data/cache/geoip_country_index.npz"
+ALLOWED_COUNTRIES = ("US",)
+
+
+class GeoIPIndex:
+    """Country database flattened into sorted [start, end] IP intervals.
+
+    IPv4 bounds are uint32, IPv6 bounds are 16-byte big-endian strings (which sort
+    like the addresses they encode); a lookup is one np.searchsorted per family.
+    """
+
+    def __init__(self, v4_starts, v4_ends, v4_country, v6_starts, v6_ends, v6_country, countries):
+        self.v4_starts, self.v4_ends, self.v4_country = v4_starts, v4_ends, v4_country
+        self.v6_starts, self.v6_ends, self.v6_country = v6_starts, v6_ends, v6_country
+        self.countries = np.asarray(countries, dtype=object)
+
+    @classmethod
+    def from_mmdb(cls, db_path=DEFAULT_DB_PATH):
+        import maxminddb
+
+        codes, v4, v6 = {}, [], []
+        with maxminddb.open_database(db_path) as reader:
+            for network, record in reader:
+                iso_code = ((record or {}).get("country") or {}).get("iso_code")
+                if iso_code is None:
+                    continue
+                code = codes.setdefault(iso_code, len(codes))
+                first, last = int(network.network_address), int(network.broadcast_address)
+                if network.version == 4:
+                    v4.append((first, last, code))
+                else:
+                    v6.append((first.to_bytes(16, "big"), last.to_bytes(16, "big"), code))
+        v4.sort()
+        v6.sort()
+        return cls(
+            np.array([r[0] for r in v4], dtype=np.uint32),
+            np.array([r[1] for r in v4], dtype=np.uint32),
+            np.array([r[2] for r in v4], dtype=np.int32),
+            np.array([r[0] for r in v6], dtype="S16"),
+            np.array([r[1] for r in v6], dtype="S16"),
+            np.array([r[2] for r in v6], dtype=np.int32),
+            sorted(codes, key=codes.get),
+        )
+
+    def save(self, path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path, v4_starts=self.v4_starts, v4_ends=self.v4_ends, v4_country=self.v4_country,
+            v6_starts=self.v6_starts, v6_ends=self.v6_ends, v6_country=self.v6_country,
+            countries=np.array(list(self.countries), dtype="U2"),
+        )
+
+    @classmethod
+    def load(cls, db_path=DEFAULT_DB_PATH, index_path=DEFAULT_INDEX_PATH):
+        """Load the flattened index, rebuilding it when the .mmdb is newer than the cached copy"""
+        if index_path and os.path.exists(index_path) and os.path.getmtime(index_path) >= os.path.getmtime(db_path):
+            data = np.load(index_path)
+            return cls(
+                data["v4_starts"], data["v4_ends"], data["v4_country"],
+                data["v6_starts"], data["v6_ends"], data["v6_country"], data["countries"].tolist(),
+            )
+        index = cls.from_mmdb(db_path)
+        if index_path:
+            index.save(index_path)
+        return index
+
+    @staticmethod
+    def _search(starts, ends, country, keys):
+        if len(starts) == 0:
+            return np.full(len(keys), -1)
+        pos = np.searchsorted(starts, keys, side="right") - 1
+        safe = np.maximum(pos, 0)
+        hit = (pos >= 0) & (keys <= ends[safe])
+        return np.where(hit, country[safe], -1)
+
+    def lookup_many(self, ips):
+        """ISO country code for every IP (None when unknown or unparseable)"""
+        codes = np.full(len(ips), -1, dtype=np.int64)
+        v4_pos, v4_keys, v6_pos, v6_keys = [], [], [], []
+        for i, ip in enumerate(ips):
+            try:
+                addr = ipaddress.ip_address(ip)
+            except ValueError:
+                continue
+            if addr.version == 6 and addr.ipv4_mapped is not None:
+                addr = addr.ipv4_mapped
+            if addr.version == 4:
+                v4_pos.append(i)
+                v4_keys.append(int(addr))
+            else:
+                v6_pos.append(i)
+                v6_keys.append(addr.packed)
+        if v4_pos:
+            codes[v4_pos] = self._search(
+                self.v4_starts, self.v4_ends, self.v4_country, np.array(v4_keys, dtype=np.uint32)
+            )
+        if v6_pos:
+            codes[v6_pos] = self._search(
+                self.v6_starts, self.v6_ends, self.v6_country, np.array(v6_keys, dtype="S16")
+            )
+        return [self.countries[c] if c >= 0 else None for c in codes]
+
+    def lookup(self, ip):
+        return self.lookup_many([ip])[0]
+
+
+@lru_cache(maxsize=None)
+def get_geoip_index(db_path=DEFAULT_DB_PATH, index_path=DEFAULT_INDEX_PATH):
+    """Process-wide index, loaded on first use"""
+    return GeoIPIndex.load(db_path, index_path)
+
+
+def check_ips_residency(ips, allowed=ALLOWED_COUNTRIES):
+    """(all IPs in allowed countries, {ip: country}) — one bulk lookup for all addresses"""
+    try:
+        countries = get_geoip_index().lookup_many(list(ips))
+    except Exception:
+        countries = [None] * len(ips)
+    by_ip = {ip: country or "Unknown" for ip, country in zip(ips, countries)}
+    ok = bool(by_ip) and all(country in allowed for country in by_ip.values())
+    return ok, by_ip
+
+
+def check_data_location(ip, allowed=ALLOWED_COUNTRIES):
+    """Single-IP check kept for existing callers: (in allowed country, ISO code or 'Unknown')"""
+    ok, by_ip = check_ips_residency([ip], allowed)
+    return ok, by_ip[ip]
@@ -0,0 +1,214 @@
+# =========================
+# Streaming HTML Extraction — incremental, event-based paragraph extraction
+# =========================
+#
+# No document tree is built: html.parser.HTMLParser is fed the response chunk by
+# chunk; paragraphs are yielded as soon as their element closes,
+# and extraction (and with the fetcher, the download itself) stops once a
+# character budget is reached. Memory is bounded by the open element stack plus
+# the paragraph being collected.
+
+import codecs
+import hashlib
+import json
+from html.parser import HTMLParser
+
+SKIP_TAGS = frozenset({"script", "style", "noscript", "template", "svg"})
+VOID_TAGS = frozenset({
+    "area", "base", "br", "col", "embed", "hr", "img", "input", "link", "meta", "param", "source", "track", "wbr",
+})
+BLOCK_TAGS = frozenset({
+    "address", "article", "aside", "blockquote", "br", "caption", "dd", "div", "dl", "dt", "fieldset",
+    "figcaption", "figure", "footer", "form", "h1", "h2", "h3", "h4", "h5", "h6", "header", "hr", "li",
+    "main", "nav", "ol", "option", "p", "pre", "section", "table", "td", "th", "title", "tr", "ul",
+})
+STREAM_CHUNK = 64 * 1024
+
+
+def parse_selector(selector):
+    """'tag', '.class', '#id', 'tag.class' or 'tag#id' -> (tag, class, id), None for unset parts"""
+    tag, cls, id_ = selector, None, None
+    if "#" in tag:
+        tag, id_ = tag.split("#", 1)
+    if "." in tag:
+        tag, cls = tag.split(".", 1)
+    return tag.lower() or None, cls, id_
+
+
+def _matches(selector, tag, attrs):
+    sel_tag, sel_cls, sel_id = selector
+    if sel_tag is not None and sel_tag != tag:
+        return False
+    if sel_id is not None and attrs.get("id") != sel_id:
+        return False
+    if sel_cls is not None and sel_cls not in (attrs.get("class") or "").split():
+        return False
+    return True
+
+
+class ParagraphParser(HTMLParser):
+    """Collects whitespace-normalized paragraphs into `self.ready` as elements close.
+
+    tags     only text inside these elements, one paragraph per element (e.g. ("p",));
+             None splits all visible text at block-level boundaries
+    within   selectors; only text under a matching element is kept (e.g. ["main", "#content"])
+    exclude  selectors whose subtrees are dropped (e.g. ["nav", "footer"])
+    """
+
+    def __init__(self, tags=None, within=None, exclude=None):
+        super().__init__(convert_charrefs=True)
+        self.tags = frozenset(t.lower() for t in tags) if tags else None
+        self.within = [parse_selector(s) for s in within or []]
+        self.exclude = [parse_selector(s) for s in exclude or []]
+        self.stack = []  # (tag, is_target, is_within, is_skipped) per open element
+        self.target_depth = self.within_depth = self.skip_depth = 0
+        self.parts = []
+        self.ready = []
+
+    def _flush(self):
+        text = " ".join("".join(self.parts).split())
+        self.parts = []
+        if text:
+            self.ready.append(text)
+
+    def _boundary(self, tag):
+        return tag in self.tags if self.tags is not None else tag in BLOCK_TAGS
+
+    def handle_starttag(self, tag, attrs):
+        if self._boundary(tag):
+            self._flush()
+        if tag in VOID_TAGS:
+            return
+        attrs = dict(attrs)
+        entry = (
+            tag,
+            self.tags is not None and tag in self.tags,
+            any(_matches(s, tag, attrs) for s in self.within),
+            tag in SKIP_TAGS or any(_matches(s, tag, attrs) for s in self.exclude),
+        )
+        self.stack.append(entry)
+        self.target_depth += entry[1]
+        self.within_depth += entry[2]
+        self.skip_depth += entry[3]
+
+    def handle_startendtag(self, tag, attrs):
+        if self._boundary(tag):
+            self._flush()
+
+    def handle_endtag(self, tag):
+        # Tolerate unclosed elements: pop up to the nearest matching open tag, ignore stray end tags
+        if not any(entry[0] == tag for entry in self.stack):
+            return
+        while self.stack:
+            entry = self.stack.pop()
+            self.target_depth -= entry[1]
+            self.within_depth -= entry[2]
+            self.skip_depth -= entry[3]
+            if self._boundary(entry[0]):
+                self._flush()
+            if entry[0] == tag:
+                break
+
+    def handle_data(self, data):
+        if self.skip_depth:
+            return
+        if self.within and not self.within_depth:
+            return
+        if self.tags is not None and not self.target_depth:
+            return
+        self.parts.append(data)
+
+    def close(self):
+        super().close()
+        self._flush()
+
+
+class ParagraphStream:
+    """Push interface: feed() raw chunks, get back the paragraphs completed so far.
+
+    Bytes are decoded incrementally (multi-byte characters may span chunks);
+    paragraphs of `min_length` characters or fewer are dropped, and once `max_chars`
+    characters were returned the last paragraph is cut and `exhausted` is set.
+    """
+
+    def __init__(self, tags=None, within=None, exclude=None, min_length=0, max_chars=None, encoding="utf-8"):
+        self.parser = ParagraphParser(tags, within, exclude)
+        self.decoder = codecs.getincrementaldecoder(encoding)(errors="replace")
+        self.min_length = min_length
+        self.remaining = max_chars
+        self.exhausted = False
+
+    def _take(self):
+        ready, self.parser.ready = self.parser.ready, []
+        out = []
+        for paragraph in ready:
+            if self.exhausted:
+                break
+            if len(paragraph) <= self.min_length:
+                continue
+            if self.remaining is not None:
+                paragraph = paragraph[:self.remaining]
+                self.remaining -= len(paragraph)
+                self.exhausted = self.remaining <= 0
+            out.append(paragraph)
+        return out
+
+    def feed(self, chunk):
+        if self.exhausted:
+            return []
+        self.parser.feed(self.decoder.decode(chunk) if isinstance(chunk, bytes) else chunk)
+        return self._take()
+
+    def close(self):
+        if self.exhausted:
+            return []
+        self.parser.feed(self.decoder.decode(b"", final=True))
+        self.parser.close()
+        return self._take()
+
+
+def iter_paragraphs(source, tags=None, within=None, exclude=None, min_length=0, max_chars=None,
+                    encoding="utf-8"):
+    """Yield paragraphs from HTML as they complete, stopping early at the `max_chars` budget.
+
+    `source` is the page as str/bytes or an iterable of chunks (e.g. a response byte stream).
+    """
+    stream = ParagraphStream(tags, within, exclude, min_length, max_chars, encoding)
+    chunks = source
+    if isinstance(source, (str, bytes)):
+        # Feed whole documents in slices too, so the budget also cuts parsing short
+        chunks = (source[start:start + STREAM_CHUNK] for start in range(0, len(source), STREAM_CHUNK))
+    for chunk in chunks:
+        yield from stream.feed(chunk)
+        if stream.exhausted:
+            return
+    yield from stream.close()
+
+
+class Extraction:
+    """Reusable extraction spec, usable as `parse=` for async_fetcher.fetch_all.
+
+    Called with a whole document it returns the paragraphs (or, with `join`, one
+    string); the fetcher instead feeds the response body to `stream()` chunk by
+    chunk and stops downloading once the character budget is reached.
+    """
+
+    def __init__(self, tags=None, within=None, exclude=None, min_length=0, max_chars=None, join=None):
+        self.options = {"tags": tags, "within": within, "exclude": exclude,
+                        "min_length": min_length, "max_chars": max_chars}
+        self.join = join
+
+    @property
+    def cache_key(self):
+        """Identifies the extraction options, so results cached under other options are never reused"""
+        spec = json.dumps({"options": self.options, "join": self.join}, sort_keys=True, default=sorted)
+        return "extraction-" + hashlib.blake2b(spec.encode("utf-8"), digest_size=8).hexdigest()
+
+    def result(self, paragraphs):
+        return self.join.join(paragraphs) if self.join is not None else list(paragraphs)
+
+    def __call__(self, html):
+        return self.result(iter_paragraphs(html, **self.options))
+
+    def stream(self, encoding="utf-8"):
+        return ParagraphStream(encoding=encoding, **self.options)
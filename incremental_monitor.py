@@ -0,0 +1,69 @@
+# =========================
+# Incremental Monitor — only re-embed paragraphs that were added or changed
+# =========================
+
+import hashlib
+
+from chunking import encode_paragraphs, page_chunks, pool_scores
+from compliance_scoring import normalize_rows
+
+
+def fingerprint(paragraph):
+    """Stable fingerprint of a paragraph (whitespace-insensitive)"""
+    text = " ".join(paragraph.split())
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class IncrementalMonitor:
+    """Keeps per-paragraph window embeddings between scan cycles.
+
+    `fetch_paragraphs(urls)` must return {url: [paragraph, ...]} (None for pages
+    that failed to fetch). Each scan re-fetches every page and scores it over the
+    same paragraph-anchored token windows as chunking.score_pages (max-pooled per
+    rule), so a page gets the same matched rule here as in a one-shot run. Windows
+    never cross paragraphs, so only paragraphs not seen in the previous cycle are
+    encoded and the cost of a cycle follows the churn rather than the size of the site.
+    """
+
+    def __init__(self, embedder, rule_embeddings, fetch_paragraphs):
+        self.embedder = embedder
+        self.rule_embeddings = normalize_rows(rule_embeddings)
+        self.fetch_paragraphs = fetch_paragraphs
+        self.page_fingerprints = {}  # url -> [paragraph fingerprint, ...]
+        self.page_paragraphs = {}    # url -> paragraphs as scored
+        self.windows = {}            # chunking.paragraph_key -> (window spans, normalized embeddings)
+
+    def scan(self, urls):
+        """Run one cycle; returns {url: {"rule_scores", "best_offsets", "paragraphs", "added", "removed"}}"""
+        fetched = self.fetch_paragraphs(urls)
+        changes = {}
+        for url in urls:
+            paragraphs = fetched.get(url)
+            if paragraphs is None:  # fetch failed: keep the previous state of the page
+                changes[url] = (0, 0)
+                continue
+            fingerprints = [fingerprint(p) for p in paragraphs]
+            previous = set(self.page_fingerprints.get(url, []))
+            current = set(fingerprints)
+            changes[url] = (len(current - previous), len(previous - current))
+            self.page_fingerprints[url] = fingerprints
+            self.page_paragraphs[url] = list(paragraphs)
+
+        pages = {url: self.page_paragraphs.get(url, []) for url in urls}
+        # Only this cycle's paragraphs are kept; anything else has changed or gone
+        self.windows = encode_paragraphs(self.embedder, [p for page in pages.values() for p in page],
+                                         known=self.windows)
+        owners, offsets, embeddings = page_chunks(pages, self.windows)
+        scores = pool_scores(pages, owners, offsets, embeddings, self.rule_embeddings)
+
+        results = {}
+        for url in urls:
+            added, removed = changes[url]
+            results[url] = {
+                "rule_scores": scores[url]["max_scores"],
+                "best_offsets": scores[url]["best_offsets"],
+                "paragraphs": len(self.page_fingerprints.get(url, [])),
+                "added": added,
+                "removed": removed,
+            }
+        return results
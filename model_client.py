@@ -0,0 +1,127 @@
+# =========================
+# Model Client — thin clients for the warm model server (model_server.py)
+# =========================
+#
+# Scripts opt in by setting COMPLIANCE_MODEL_SERVER (e.g. http://127.0.0.1:8765):
+# get_embedder() and get_pipeline() then return remote stand-ins with the same
+# call signatures, and no model is loaded in the script's own process. Without
+# the variable both load the models locally as before.
+
+import base64
+import json
+import os
+import urllib.request
+
+import numpy as np
+
+SERVER_ENV = "COMPLIANCE_MODEL_SERVER"
+DEFAULT_SERVER_URL = "http://127.0.0.1:8765"
+OUTPUT_KEYS = {"summarization": "summary_text", "text2text-generation": "generated_text"}
+
+
+def server_url():
+    """URL of the model server the scripts should use, or None to load models locally"""
+    return os.environ.get(SERVER_ENV) or None
+
+
+def decode_array(payload):
+    data = np.frombuffer(base64.b64decode(payload["data"]), dtype=payload["dtype"])
+    return data.reshape(payload["shape"]).copy()
+
+
+def encode_array(array):
+    array = np.ascontiguousarray(array)
+    return {"data": base64.b64encode(array.tobytes()).decode("ascii"),
+            "dtype": array.dtype.name, "shape": list(array.shape)}
+
+
+class ModelClient:
+    """JSON-over-HTTP client; each call blocks until the server's micro-batch containing it has run"""
+
+    def __init__(self, url=None, timeout=600):
+        self.url = (url or server_url() or DEFAULT_SERVER_URL).rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None):
+        data = json.dumps(payload).encode("utf-8") if payload is not None else None
+        request = urllib.request.Request(self.url + path, data=data, headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+            return json.loads(resp.read().decode("utf-8"))
+
+    def info(self, model, backend=None):
+        return self._request("/v1/info", {"model": model, "backend": backend})
+
+    def encode(self, model, texts, backend=None, **options):
+        payload = {"model": model, "backend": backend, "texts": list(texts), "options": options}
+        return decode_array(self._request("/v1/encode", payload)["embeddings"])
+
+    def generate(self, task, model, texts, **gen_kwargs):
+        payload = {"task": task, "model": model, "texts": list(texts), "options": gen_kwargs}
+        return self._request("/v1/generate", payload)["outputs"]
+
+    def metrics(self):
+        return self._request("/v1/metrics")
+
+
+class RemoteEmbedder:
+    """SentenceTransformer stand-in whose encode() runs on the model server.
+
+    `backend` picks the server-side encoder ("torch" or "onnx"; None leaves it to
+    the server). `self.backend` is the one the server reports using.
+    """
+
+    def __init__(self, model_name, client=None, backend=None):
+        self.model_name = model_name
+        self.client = client or ModelClient()
+        info = self.client.info(model_name, backend)
+        self.dim = info["dim"]
+        self.max_seq_length = info["max_seq_length"]
+        self.backend = info["backend"]
+
+    @property
+    def device(self):
+        return "cpu"  # vectors arrive as numpy arrays in this process
+
+    def get_sentence_embedding_dimension(self):
+        return self.dim
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=None, convert_to_numpy=True,
+               convert_to_tensor=False, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if texts:
+            embeddings = self.client.encode(self.model_name, texts, backend=self.backend,
+                                            normalize_embeddings=normalize_embeddings)
+        else:
+            embeddings = np.empty((0, self.dim), dtype=np.float32)
+        if single:
+            embeddings = embeddings[0]
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(embeddings)
+        return embeddings
+
+
+class RemotePipeline:
+    """transformers.pipeline stand-in for summarization / text2text-generation on the model server"""
+
+    def __init__(self, task, model_name, client=None):
+        self.task = task
+        self.model_name = model_name
+        self.client = client or ModelClient()
+
+    def __call__(self, inputs, batch_size=None, **gen_kwargs):
+        texts = [inputs] if isinstance(inputs, str) else list(inputs)
+        outputs = self.client.generate(self.task, self.model_name, texts, **gen_kwargs) if texts else []
+        return [{OUTPUT_KEYS[self.task]: output} for output in outputs]
+
+
+def get_pipeline(task, model_name, device=None):
+    """Remote pipeline when COMPLIANCE_MODEL_SERVER is set, otherwise a local transformers pipeline"""
+    if server_url():
+        return RemotePipeline(task, model_name, ModelClient())
+    from transformers import pipeline
+    if device is None:
+        import torch
+        device = 0 if torch.cuda.is_available() else -1
+    return pipeline(task, model=model_name, device=device)
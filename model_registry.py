@@ -0,0 +1,98 @@
+# =========================
+# Model Registry — lazy, per-process memoized model loading
+# =========================
+#
+# Scripts declare the models they might need up front:
+#
+#   embedder = lazy_embedder("all-MiniLM-L6-v2")
+#   summarizer = lazy_pipeline("summarization", "sshleifer/distilbart-cnn-12-6")
+#
+# Nothing is imported or loaded until the first encode()/call, so a run that
+# fails while fetching, or never needs summaries, never pays for torch,
+# transformers or the model weights. Every model is loaded at most once per
+# process, however many scripts or modules ask for it.
+
+import threading
+
+_lock = threading.RLock()
+_models = {}  # (kind, name, device) -> loaded model
+
+
+def _load_embedder(backend=None):
+    def load(name, device):
+        from embedding_cache import get_embedder
+        return get_embedder(name, device=device, backend=backend)
+    return load
+
+
+def _load_pipeline(task):
+    def load(name, device):
+        from model_client import get_pipeline
+        return get_pipeline(task, name, device=device)
+    return load
+
+
+LOADERS = {
+    "embedder": _load_embedder(),  # backend from COMPLIANCE_EMBEDDER_BACKEND
+    "torch-embedder": _load_embedder("torch"),
+    "onnx-embedder": _load_embedder("onnx"),
+    "summarization": _load_pipeline("summarization"),
+    "text2text-generation": _load_pipeline("text2text-generation"),
+}
+
+
+def get_model(kind, name, device=None):
+    """Load (or return the already loaded) model; `kind` is a LOADERS key"""
+    key = (kind, name, device)
+    with _lock:
+        if key not in _models:
+            if kind not in LOADERS:
+                raise ValueError(f"Unknown model kind {kind!r}; expected one of {sorted(LOADERS)}")
+            _models[key] = LOADERS[kind](name, device)
+        return _models[key]
+
+
+def loaded_models():
+    with _lock:
+        return list(_models)
+
+
+class LazyModel:
+    """Placeholder that loads its model on first attribute access or call, then delegates to it"""
+
+    def __init__(self, kind, name, device=None):
+        self._spec = (kind, name, device)
+
+    @property
+    def model_name(self):
+        return self._spec[1]  # known without loading, e.g. for cache keys
+
+    @property
+    def loaded(self):
+        with _lock:
+            return self._spec in _models
+
+    def get(self):
+        return get_model(*self._spec)
+
+    def __getattr__(self, attr):
+        if attr.startswith("__") or attr == "_spec":
+            raise AttributeError(attr)
+        return getattr(self.get(), attr)
+
+    def __call__(self, *args, **kwargs):
+        return self.get()(*args, **kwargs)
+
+    def __repr__(self):
+        kind, name, _ = self._spec
+        return f"LazyModel({kind}:{name}, {'loaded' if self.loaded else 'not loaded'})"
+
+
+def lazy_embedder(name="all-MiniLM-L6-v2", device=None, backend=None):
+    """`backend` "torch" or "onnx"; None follows COMPLIANCE_EMBEDDER_BACKEND (default torch)"""
+    return LazyModel(f"{backend}-embedder" if backend else "embedder", name, device)
+
+
+def lazy_pipeline(task, name, device=None):
+    """`device` None picks the first GPU when available (decided at load time)"""
+    return LazyModel(task, name, device)
@@ -0,0 +1,328 @@
+# =========================
+# Model Server — resident models behind a localhost endpoint, with dynamic micro-batching
+# =========================
+#
+#   python model_server.py --preload all-MiniLM-L6-v2 \
+#       summarization=sshleifer/distilbart-cnn-12-6 text2text-generation=google/flan-t5-small
+#   export COMPLIANCE_MODEL_SERVER=http://127.0.0.1:8765   # scripts become thin clients
+#
+# Models are loaded once (on --preload or on first use) and stay resident.
+# Concurrent requests for the same model and options are merged into one
+# forward pass: the first request opens a batch and waits up to --max-wait-ms
+# for others, up to --max-batch texts. GET /v1/metrics reports queue depth,
+# batch sizes and latencies per model.
+#
+# Endpoints (JSON):
+#   POST /v1/encode    {"model", "backend", "texts", "options"} -> {"embeddings": base64 float32}
+#   POST /v1/generate  {"task", "model", "texts", "options"} -> {"outputs": [str, ...]}
+#   POST /v1/info      {"model", "backend"} -> {"dim", "max_seq_length", "backend"}
+#   GET  /v1/metrics
+#
+# Encoders are resident per backend ("torch" or "onnx", see embedding_cache.py);
+# requests without one get the server's COMPLIANCE_EMBEDDER_BACKEND.
+
+import argparse
+import json
+import queue
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from embedding_cache import backend_model_id, resolve_backend
+from model_client import DEFAULT_SERVER_URL, OUTPUT_KEYS, encode_array
+
+DEFAULT_MAX_BATCH = 32
+DEFAULT_MAX_WAIT_MS = 5
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128)
+
+
+class BatchMetrics:
+    """Counters for one batcher; snapshot() is what /v1/metrics returns"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.requests = self.items = self.batches = self.errors = 0
+        self.max_queue_depth = 0
+        self.wait_ms = self.run_ms = 0.0
+        self.batch_sizes = dict.fromkeys(BATCH_SIZE_BUCKETS, 0)
+
+    def record(self, requests, items, queue_depth, wait_ms, run_ms, failed=False):
+        bucket = next((b for b in BATCH_SIZE_BUCKETS if items <= b), BATCH_SIZE_BUCKETS[-1])
+        with self.lock:
+            self.requests += requests
+            self.items += items
+            self.batches += 1
+            self.errors += int(failed)
+            self.max_queue_depth = max(self.max_queue_depth, queue_depth)
+            self.wait_ms += wait_ms
+            self.run_ms += run_ms
+            self.batch_sizes[bucket] += 1
+
+    def snapshot(self, queue_depth):
+        with self.lock:
+            batches = max(1, self.batches)
+            return {
+                "queue_depth": queue_depth,
+                "max_queue_depth": self.max_queue_depth,
+                "requests": self.requests,
+                "items": self.items,
+                "batches": self.batches,
+                "errors": self.errors,
+                "mean_batch_size": self.items / batches,
+                "mean_requests_per_batch": self.requests / batches,
+                "mean_wait_ms": self.wait_ms / max(1, self.requests),
+                "mean_run_ms": self.run_ms / batches,
+                "batch_size_histogram": {f"<={b}": n for b, n in self.batch_sizes.items()},
+            }
+
+
+class _Request:
+    __slots__ = ("items", "options", "key", "enqueued", "done", "results", "error")
+
+    def __init__(self, items, options):
+        self.items = items
+        self.options = options
+        self.key = json.dumps(options, sort_keys=True)
+        self.enqueued = time.perf_counter()
+        self.done = threading.Event()
+        self.results = None
+        self.error = None
+
+
+class MicroBatcher:
+    """Merges concurrent submit() calls into batched calls of `run(items, **options)`.
+
+    A worker thread takes the oldest request, then keeps collecting until
+    `max_batch` items are queued or `max_wait` seconds have passed. Requests
+    whose options differ (e.g. generation kwargs) run in separate sub-batches.
+    """
+
+    def __init__(self, run, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT_MS / 1000):
+        self.run = run
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.queue = queue.Queue()
+        self.metrics = BatchMetrics()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, items, **options):
+        request = _Request(list(items), options)
+        self.queue.put(request)
+        request.done.wait()
+        if request.error is not None:
+            raise request.error
+        return request.results
+
+    def _collect(self):
+        batch = [self.queue.get()]
+        size = len(batch[0].items)
+        deadline = time.perf_counter() + self.max_wait
+        while size < self.max_batch:
+            timeout = deadline - time.perf_counter()
+            if timeout <= 0:
+                break
+            try:
+                request = self.queue.get(timeout=timeout)
+            except queue.Empty:
+                break
+            batch.append(request)
+            size += len(request.items)
+        return batch
+
+    def _loop(self):
+        while True:
+            batch = self._collect()
+            depth = self.queue.qsize()
+            groups = {}
+            for request in batch:
+                groups.setdefault(request.key, []).append(request)
+            for requests in groups.values():
+                items = [item for request in requests for item in request.items]
+                started = time.perf_counter()
+                wait_ms = sum((started - r.enqueued) * 1000 for r in requests)
+                try:
+                    results = self.run(items, **requests[0].options)
+                    error = None
+                except Exception as e:
+                    results, error = None, e
+                run_ms = (time.perf_counter() - started) * 1000
+                self.metrics.record(len(requests), len(items), depth, wait_ms, run_ms, error is not None)
+                offset = 0
+                for request in requests:
+                    if error is None:
+                        request.results = results[offset:offset + len(request.items)]
+                        offset += len(request.items)
+                    request.error = error
+                    request.done.set()
+
+
+class ModelHost:
+    """Resident models, each fronted by its own MicroBatcher"""
+
+    def __init__(self, max_batch=DEFAULT_MAX_BATCH, max_wait=DEFAULT_MAX_WAIT_MS / 1000, device=None):
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.device = device
+        self.lock = threading.Lock()
+        self.models = {}    # (task, model id) -> loaded model; encoder ids include the backend
+        self.batchers = {}  # (task, model id) -> MicroBatcher
+        self.loading = {}   # (task, model id) -> Event, set when its load has finished or failed
+
+    @staticmethod
+    def _key(task, model_name, backend):
+        return (task, backend_model_id(model_name, backend) if task == "encode" else model_name)
+
+    def _load(self, task, model_name, backend):
+        if task == "encode":
+            # No embedding cache here: clients cache on their side, and two writers
+            # on one cache directory would only contend for it
+            from embedding_cache import get_embedder
+            return get_embedder(model_name, device=self.device, remote=False, backend=backend, cached=False)
+        from transformers import pipeline
+        device = self.device
+        if device is None:
+            import torch
+            device = 0 if torch.cuda.is_available() else -1
+        return pipeline(task, model=model_name, device=device)
+
+    def _runner(self, task, model):
+        if task == "encode":
+            def run(texts, **options):
+                return list(model.encode(texts, convert_to_numpy=True, batch_size=self.max_batch, **options))
+        else:
+            def run(texts, **options):
+                outputs = model(texts, batch_size=len(texts), **options)
+                return [output[OUTPUT_KEYS[task]] for output in outputs]
+        return run
+
+    def batcher(self, task, model_name, backend=None):
+        """The model's MicroBatcher, loading the model on first use.
+
+        Loading happens outside the host lock, so requests for models that are
+        already resident (and /v1/metrics) never wait behind a slow load; callers
+        asking for the same model meanwhile wait for that one load. `backend`
+        only applies to encoders (default: this process's COMPLIANCE_EMBEDDER_BACKEND).
+        """
+        if task != "encode" and task not in OUTPUT_KEYS:
+            raise ValueError(f"Unsupported task {task!r}")
+        backend = resolve_backend(backend)
+        key = self._key(task, model_name, backend)
+        while True:
+            with self.lock:
+                if key in self.batchers:
+                    return self.batchers[key]
+                event = self.loading.get(key)
+                loader = event is None
+                if loader:
+                    event = self.loading[key] = threading.Event()
+            if not loader:
+                event.wait()
+                continue  # loaded by now, or the load failed and is retried here
+            try:
+                model = self._load(task, model_name, backend)
+                batcher = MicroBatcher(self._runner(task, model), self.max_batch, self.max_wait)
+                with self.lock:
+                    self.models[key] = model
+                    self.batchers[key] = batcher
+            finally:
+                with self.lock:
+                    del self.loading[key]
+                event.set()
+
+    def info(self, model_name, backend=None):
+        backend = resolve_backend(backend)
+        self.batcher("encode", model_name, backend)
+        model = self.models[self._key("encode", model_name, backend)]
+        return {"dim": model.get_sentence_embedding_dimension(), "max_seq_length": model.max_seq_length,
+                "backend": backend}
+
+    def metrics(self):
+        with self.lock:
+            batchers = dict(self.batchers)
+        return {f"{task}:{model}": b.metrics.snapshot(b.queue.qsize()) for (task, model), b in batchers.items()}
+
+
+class ModelRequestHandler(BaseHTTPRequestHandler):
+    host = None  # ModelHost, set by serve()
+
+    def _reply(self, status, payload):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/v1/metrics":
+            self._reply(200, self.host.metrics())
+        else:
+            self._reply(404, {"error": f"unknown path {self.path}"})
+
+    def do_POST(self):
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            if self.path == "/v1/encode":
+                vectors = self.host.batcher("encode", request["model"], request.get("backend")).submit(
+                    request["texts"], **request.get("options", {})
+                )
+                self._reply(200, {"embeddings": encode_array(np.asarray(vectors, dtype=np.float32))})
+            elif self.path == "/v1/generate":
+                outputs = self.host.batcher(request["task"], request["model"]).submit(
+                    request["texts"], **request.get("options", {})
+                )
+                self._reply(200, {"outputs": outputs})
+            elif self.path == "/v1/info":
+                self._reply(200, self.host.info(request["model"], request.get("backend")))
+            else:
+                self._reply(404, {"error": f"unknown path {self.path}"})
+        except Exception as e:
+            self._reply(500, {"error": f"{type(e).__name__}: {e}"})
+
+    def log_message(self, format, *args):
+        pass  # one line per request drowns the metrics; use /v1/metrics instead
+
+
+def parse_model_spec(spec):
+    """'all-MiniLM-L6-v2' -> ('encode', name); 'summarization=model' -> (task, model)"""
+    if "=" in spec:
+        task, model_name = spec.split("=", 1)
+        return task, model_name
+    return "encode", spec
+
+
+def serve(host_name="127.0.0.1", port=8765, preload=(), max_batch=DEFAULT_MAX_BATCH,
+          max_wait_ms=DEFAULT_MAX_WAIT_MS, device=None):
+    model_host = ModelHost(max_batch, max_wait_ms / 1000, device)
+    for spec in preload:
+        task, model_name = parse_model_spec(spec)
+        started = time.perf_counter()
+        model_host.batcher(task, model_name)
+        print(f"Loaded {task}:{model_name} in {time.perf_counter() - started:.1f}s")
+    handler = type("Handler", (ModelRequestHandler,), {"host": model_host})
+    server = ThreadingHTTPServer((host_name, port), handler)
+    server.daemon_threads = True
+    print(f"Model server listening on http://{host_name}:{port}")
+    try:
+        server.serve_forever()
+    finally:
+        server.server_close()
+
+
+def main():
+    default_port = int(DEFAULT_SERVER_URL.rsplit(":", 1)[1])
+    parser = argparse.ArgumentParser(description="Warm model server with micro-batching")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=default_port)
+    parser.add_argument("--preload", nargs="*", default=[], help="MODEL (encoder) or TASK=MODEL")
+    parser.add_argument("--max-batch", type=int, default=DEFAULT_MAX_BATCH)
+    parser.add_argument("--max-wait-ms", type=float, default=DEFAULT_MAX_WAIT_MS)
+    parser.add_argument("--device", default=None)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.preload, args.max_batch, args.max_wait_ms, args.device)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,181 @@
+# =========================
+# ONNX Embedder — dynamic-int8 ONNX Runtime backend for sentence-transformer models
+# =========================
+#
+# Production nodes are CPU-only, where eager PyTorch fp32 is the slowest way to
+# run MiniLM. export_model() converts a SentenceTransformer once into:
+#
+#   data/models/onnx/<model>/model.int8.onnx   transformer graph, MatMul weights int8
+#   data/models/onnx/<model>/tokenizer.json    fast tokenizer (no transformers at runtime)
+#   data/models/onnx/<model>/meta.json         pooling / normalization / max length
+#
+# OnnxEmbedder then reproduces the SentenceTransformer pipeline (tokenize, run
+# the graph, attention-masked mean pooling, optional L2 normalization) with only
+# onnxruntime, tokenizers and numpy. Its encode() takes the same arguments as
+# SentenceTransformer.encode. Quantization changes the vectors slightly: every
+# vector must have cosine >= 1 - COSINE_TOLERANCE with the eager fp32 vector of
+# the same text. bench_embedding_backends.py checks this and compares speed.
+#
+# Select it with get_embedder(..., backend="onnx"), lazy_embedder(..., backend="onnx")
+# or COMPLIANCE_EMBEDDER_BACKEND=onnx for every script.
+
+import inspect
+import json
+import os
+import re
+
+import numpy as np
+
+from compliance_scoring import normalize_rows
+
+DEFAULT_MODEL_DIR = "data/models/onnx"
+MODEL_FILE = "model.int8.onnx"
+META_FILE = "meta.json"
+DEFAULT_OPSET = 14
+COSINE_TOLERANCE = 0.02  # per-vector cosine vs eager fp32 must be >= 0.98
+INPUT_NAMES = ("input_ids", "attention_mask", "token_type_ids")
+
+
+def default_model_dir(model_name):
+    return os.path.join(DEFAULT_MODEL_DIR, re.sub(r"[^A-Za-z0-9_.-]+", "_", model_name))
+
+
+def export_model(model_name="all-MiniLM-L6-v2", model_dir=None, opset=DEFAULT_OPSET):
+    """Export a mean-pooling SentenceTransformer to a dynamically int8-quantized ONNX graph.
+
+    Needs torch, sentence-transformers, onnx and onnxruntime (only once, at export).
+    Returns the model directory.
+    """
+    import torch
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+    from sentence_transformers import SentenceTransformer
+    from sentence_transformers.models import Normalize, Pooling
+
+    model_dir = model_dir or default_model_dir(model_name)
+    st_model = SentenceTransformer(model_name, device="cpu")
+    pooling = next(module for module in st_model if isinstance(module, Pooling))
+    # sentence-transformers < 5 only exposes the mode through get_pooling_mode_str()
+    mode = getattr(pooling, "pooling_mode", None) or pooling.get_pooling_mode_str()
+    if mode != "mean":
+        raise ValueError(f"{model_name} uses {mode} pooling; only mean pooling is supported")
+    transformer = st_model[0]
+    hf_model = transformer.auto_model.eval()
+    tokenizer = transformer.tokenizer
+
+    example = tokenizer(["An example clause for tracing."], return_tensors="pt")
+    input_names = [name for name in INPUT_NAMES if name in example]
+
+    class LastHiddenState(torch.nn.Module):
+        def __init__(self):
+            super().__init__()
+            self.model = hf_model
+
+        def forward(self, *inputs):
+            return self.model(**dict(zip(input_names, inputs))).last_hidden_state
+
+    os.makedirs(model_dir, exist_ok=True)
+    fp32_path = os.path.join(model_dir, "model.fp32.onnx")
+    axes = {0: "batch", 1: "sequence"}
+    # dynamic_axes is the TorchScript exporter's API; torch >= 2.9 defaults to dynamo
+    legacy = {"dynamo": False} if "dynamo" in inspect.signature(torch.onnx.export).parameters else {}
+    with torch.no_grad():
+        torch.onnx.export(
+            LastHiddenState(), tuple(example[name] for name in input_names), fp32_path,
+            input_names=input_names, output_names=["last_hidden_state"],
+            dynamic_axes={name: axes for name in input_names + ["last_hidden_state"]},
+            opset_version=opset, **legacy,
+        )
+    # Only the MatMul weights are quantized; embeddings and LayerNorm stay fp32
+    quantize_dynamic(fp32_path, os.path.join(model_dir, MODEL_FILE),
+                     weight_type=QuantType.QInt8, op_types_to_quantize=["MatMul"])
+    os.remove(fp32_path)
+    tokenizer.save_pretrained(model_dir)
+
+    meta = {
+        "model_name": model_name,
+        "dim": st_model.get_sentence_embedding_dimension(),
+        "max_seq_length": st_model.max_seq_length,
+        "normalize": any(isinstance(module, Normalize) for module in st_model),
+        "input_names": input_names,
+        "pad_id": tokenizer.pad_token_id,
+        "pad_token": tokenizer.pad_token,
+        "quantization": "dynamic-int8",
+    }
+    # Written last: its presence marks a complete export
+    meta_path = os.path.join(model_dir, META_FILE)
+    with open(meta_path + ".tmp", "w") as f:
+        json.dump(meta, f)
+    os.replace(meta_path + ".tmp", meta_path)
+    return model_dir
+
+
+class OnnxEmbedder:
+    """SentenceTransformer stand-in running an exported int8 graph on ONNX Runtime (CPU)"""
+
+    def __init__(self, model_dir, threads=None):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        with open(os.path.join(model_dir, META_FILE)) as f:
+            self.meta = json.load(f)
+        self.model_name = self.meta["model_name"]
+        self.max_seq_length = self.meta["max_seq_length"]
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if threads:
+            options.intra_op_num_threads = threads
+        self.session = ort.InferenceSession(os.path.join(model_dir, MODEL_FILE), options,
+                                            providers=["CPUExecutionProvider"])
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(self.max_seq_length)
+        self.tokenizer.enable_padding(pad_id=self.meta["pad_id"], pad_token=self.meta["pad_token"])
+
+    @property
+    def device(self):
+        return "cpu"
+
+    def get_sentence_embedding_dimension(self):
+        return self.meta["dim"]
+
+    def _embed(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        arrays = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": np.array([e.attention_mask for e in encodings], dtype=np.int64),
+            "token_type_ids": np.array([e.type_ids for e in encodings], dtype=np.int64),
+        }
+        hidden = self.session.run(None, {name: arrays[name] for name in self.meta["input_names"]})[0]
+        mask = arrays["attention_mask"][:, :, None].astype(np.float32)
+        return (hidden * mask).sum(axis=1) / np.maximum(mask.sum(axis=1), 1e-9)
+
+    def encode(self, sentences, batch_size=32, show_progress_bar=None, convert_to_numpy=True,
+               convert_to_tensor=False, normalize_embeddings=False, **kwargs):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else [str(t) for t in sentences]
+        embeddings = np.empty((len(texts), self.meta["dim"]), dtype=np.float32)
+        # Longest first, as SentenceTransformer does, so each batch pads to a similar length
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            embeddings[rows] = self._embed([texts[i] for i in rows])
+        if self.meta["normalize"] or normalize_embeddings:
+            embeddings = normalize_rows(embeddings)
+        if single:
+            embeddings = embeddings[0]
+        if convert_to_tensor:
+            import torch
+            return torch.from_numpy(embeddings)
+        return embeddings
+
+
+def ensure_exported(model_name="all-MiniLM-L6-v2", model_dir=None):
+    """Model directory of `model_name`, exporting it first if no export exists yet"""
+    model_dir = model_dir or default_model_dir(model_name)
+    if not os.path.exists(os.path.join(model_dir, META_FILE)):
+        export_model(model_name, model_dir)
+    return model_dir
+
+
+def load_onnx_embedder(model_name="all-MiniLM-L6-v2", model_dir=None, threads=None):
+    """OnnxEmbedder for `model_name`, exporting it first if no export exists yet"""
+    return OnnxEmbedder(ensure_exported(model_name, model_dir), threads=threads)
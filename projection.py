@@ -0,0 +1,107 @@
+# =========================
+# Reduced-Dimension Tier — PCA or prefix projection for coarse search, full vectors for scoring
+# =========================
+#
+# all-MiniLM-L6-v2 vectors have 384 dims. A projection to `dims` columns keeps a
+# reduced copy of the corpus (dims/384 of the bytes) that is scanned for every
+# query; only the top `rescore` candidates are scored against the full vectors.
+#
+#   pca     top right-singular vectors of the (uncentered) corpus, so dot products
+#           in the reduced space approximate the full cosine similarities
+#   prefix  the first `dims` coordinates; cheap, but only good for models trained
+#           to front-load information (Matryoshka-style)
+
+import numpy as np
+
+from compliance_scoring import normalize_rows
+from vector_index import MAX_SCORE_BLOCK, REDUCED_KINDS, rescore_candidates, top_k_rows
+
+DEFAULT_DIMS = 128
+BLOCK_ROWS = 65536
+
+
+class Projection:
+    """Linear map full -> reduced space: reduced = normalized(vectors) @ components"""
+
+    def __init__(self, components, kind="pca"):
+        self.components = np.ascontiguousarray(components, dtype=np.float32)  # (dim, dims)
+        self.kind = kind
+
+    @property
+    def dims(self):
+        return self.components.shape[1]
+
+    def transform(self, vectors):
+        if len(vectors) <= BLOCK_ROWS:
+            return normalize_rows(vectors) @ self.components
+        return np.concatenate([
+            normalize_rows(vectors[start:start + BLOCK_ROWS]) @ self.components
+            for start in range(0, len(vectors), BLOCK_ROWS)
+        ])
+
+
+def fit_pca(vectors, dims=DEFAULT_DIMS, sample_size=100_000, seed=0):
+    """PCA projection fitted on a random sample of the corpus"""
+    rng = np.random.default_rng(seed)
+    n = len(vectors)
+    rows = np.sort(rng.choice(n, size=min(n, sample_size), replace=False))
+    sample = normalize_rows(vectors[rows])
+    dims = min(dims, sample.shape[1])
+    # Uncentered: the reduced dot product then approximates the full one directly
+    _, _, vt = np.linalg.svd(sample, full_matrices=False)
+    components = np.zeros((sample.shape[1], dims), dtype=np.float32)
+    components[:, :len(vt[:dims])] = vt[:dims].T
+    return Projection(components, "pca")
+
+
+def prefix_projection(dim, dims=DEFAULT_DIMS):
+    """Projection that keeps the first `dims` coordinates"""
+    return Projection(np.eye(dim, min(dims, dim), dtype=np.float32), "prefix")
+
+
+def fit_projection(vectors, kind="pca", dims=DEFAULT_DIMS, **kwargs):
+    if kind == "pca":
+        return fit_pca(vectors, dims, **kwargs)
+    if kind == "prefix":
+        return prefix_projection(vectors.shape[1], dims)
+    raise ValueError(f"Unknown projection {kind!r}; expected one of {REDUCED_KINDS}")
+
+
+class ReducedIndex:
+    """Coarse scan over reduced vectors, exact rescoring of the top `rescore` candidates"""
+
+    def __init__(self, vectors, projection, reduced, rescore=100):
+        self.vectors = vectors  # full precision, typically the corpus memmap
+        self.projection = projection
+        self.reduced = reduced
+        self.rescore = rescore
+
+    @property
+    def kind(self):
+        return self.projection.kind
+
+    @classmethod
+    def build(cls, vectors, kind="pca", dims=DEFAULT_DIMS, rescore=100, projection=None):
+        projection = projection or fit_projection(vectors, kind, dims)
+        return cls(vectors, projection, projection.transform(vectors), rescore)
+
+    def __len__(self):
+        return len(self.reduced)
+
+    @property
+    def nbytes(self):
+        return self.reduced.nbytes + self.projection.components.nbytes
+
+    def search(self, queries, top_k=3, rescore=None):
+        queries = normalize_rows(queries)
+        block = max(1, MAX_SCORE_BLOCK // max(1, len(self.reduced)))
+        if len(queries) > block:
+            parts = [self.search(queries[start:start + block], top_k, rescore)
+                     for start in range(0, len(queries), block)]
+            return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+        rescore = max(top_k, rescore or self.rescore)
+        candidates, _ = top_k_rows(self.projection.transform(queries) @ self.reduced.T, rescore)
+        return rescore_candidates(self.vectors, queries, candidates, top_k)
+
+    def state(self):
+        return {"components": self.projection.components, "reduced": self.reduced, "rescore": self.rescore}
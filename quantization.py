@@ -0,0 +1,117 @@
+# =========================
+# Quantized Vectors — float16 / int8 / binary codes with exact rescoring
+# =========================
+#
+# Compressed codes stay in RAM and are scanned for every query; the full-precision
+# vectors (normally the memory-mapped corpus file) are only touched for the few
+# candidates that get rescored.
+#
+#   float16  2 bytes/dim  (2x smaller than float32)
+#   int8     1 byte/dim + one float32 scale per dimension (4x)
+#   binary   1 bit/dim, sign of each component, Hamming scoring (32x)
+
+import numpy as np
+
+from compliance_scoring import normalize_rows
+from vector_index import MAX_SCORE_BLOCK, QUANTIZED_KINDS as ENCODINGS, rescore_candidates, top_k_rows
+
+BLOCK_ROWS = 65536
+
+
+def _blocks(vectors):
+    for start in range(0, len(vectors), BLOCK_ROWS):
+        yield normalize_rows(vectors[start:start + BLOCK_ROWS])
+
+
+def quantize(vectors, encoding):
+    """(codes, scales) for L2-normalized `vectors`; scales is None except for int8"""
+    if encoding == "float16":
+        return np.concatenate([b.astype(np.float16) for b in _blocks(vectors)]), None
+    if encoding == "int8":
+        max_abs = np.zeros(vectors.shape[1], dtype=np.float32)
+        for block in _blocks(vectors):
+            max_abs = np.maximum(max_abs, np.abs(block).max(axis=0))
+        scales = np.maximum(max_abs, 1e-12) / 127.0
+        codes = np.concatenate([
+            np.clip(np.rint(b / scales), -127, 127).astype(np.int8) for b in _blocks(vectors)
+        ])
+        return codes, scales.astype(np.float32)
+    if encoding == "binary":
+        return np.concatenate([np.packbits(b > 0, axis=1) for b in _blocks(vectors)]), None
+    raise ValueError(f"Unknown encoding {encoding!r}; expected one of {ENCODINGS}")
+
+
+_POPCOUNT_TABLE = np.unpackbits(np.arange(256, dtype=np.uint8)[:, None], axis=1).sum(axis=1).astype(np.uint8)
+
+
+def _popcount(codes):
+    """Set bits per row of packed uint8 codes (native np.bitwise_count on numpy >= 2)"""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(codes).sum(axis=1, dtype=np.int32)
+    return _POPCOUNT_TABLE[codes].sum(axis=1, dtype=np.int32)
+
+
+def approximate_scores(codes, scales, encoding, queries, dim):
+    """Phase-1 scores of normalized `queries` against every code (higher is closer).
+
+    Codes are widened to float32 one BLOCK_ROWS block at a time, so the scan never
+    materializes a full-precision copy of the corpus.
+    """
+    scores = np.empty((len(queries), len(codes)), dtype=np.float32)
+    query_bits = np.packbits(queries > 0, axis=1) if encoding == "binary" else None
+    weighted = queries * scales if encoding == "int8" else queries
+    for start in range(0, len(codes), BLOCK_ROWS):
+        block = codes[start:start + BLOCK_ROWS]
+        end = start + len(block)
+        if encoding == "binary":
+            # Matching sign bits: dim - 2 * hamming tracks the angle between the vectors
+            for q, bits in enumerate(query_bits):
+                scores[q, start:end] = dim - 2 * _popcount(block ^ bits)
+        else:
+            scores[:, start:end] = weighted @ block.astype(np.float32).T
+    return scores
+
+
+class QuantizedIndex:
+    """Two-phase search: scan compressed codes, rescore the best candidates at full precision.
+
+    `rescore` is how many phase-1 candidates per query are rescored exactly;
+    larger values recover more recall at the cost of more full-vector reads.
+    """
+
+    def __init__(self, vectors, encoding, codes, scales=None, rescore=100):
+        self.vectors = vectors  # full precision, typically the corpus memmap
+        self.kind = encoding
+        self.codes = codes
+        self.scales = scales
+        self.rescore = rescore
+
+    @classmethod
+    def build(cls, vectors, encoding="int8", rescore=100):
+        codes, scales = quantize(vectors, encoding)
+        return cls(vectors, encoding, codes, scales, rescore)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def nbytes(self):
+        return self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0)
+
+    def search(self, queries, top_k=3, rescore=None):
+        queries = normalize_rows(queries)
+        block = max(1, MAX_SCORE_BLOCK // max(1, len(self.codes)))
+        if len(queries) > block:
+            parts = [self.search(queries[start:start + block], top_k, rescore)
+                     for start in range(0, len(queries), block)]
+            return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+        dim = self.vectors.shape[1]
+        rescore = max(top_k, rescore or self.rescore)
+        candidates, _ = top_k_rows(approximate_scores(self.codes, self.scales, self.kind, queries, dim), rescore)
+        return rescore_candidates(self.vectors, queries, candidates, top_k)
+
+    def state(self):
+        state = {"codes": self.codes, "rescore": self.rescore}
+        if self.scales is not None:
+            state["scales"] = self.scales
+        return state
@@ -0,0 +1,102 @@
+# =========================
+# Compiled Rulebook — precomputed rule and metric-value embeddings
+# =========================
+
+import os
+
+import numpy as np
+
+from compliance_scoring import normalize_rows
+
+RULEBOOK_VERSION = 1
+DEFAULT_RULEBOOK_PATH = "data/processed/rulebook.npz"
+
+# Values the metric extractors can produce; compiled into the lookup table up front
+METRIC_VALUES = [
+    "EU", "US", "authorized_only", "everyone",
+    "yes", "no", "signed", "unsigned", "unknown",
+]
+
+
+class Rulebook:
+    """Rule embeddings, metric-value embeddings and their rule × value score table"""
+
+    def __init__(self, rule_keys, rule_texts, rule_embeddings, values, value_embeddings,
+                 model_id, version=RULEBOOK_VERSION):
+        self.rule_keys = list(rule_keys)
+        self.rule_texts = list(rule_texts)
+        self.values = list(values)
+        self.rule_embeddings = np.asarray(rule_embeddings, dtype=np.float32)
+        self.value_embeddings = np.asarray(value_embeddings, dtype=np.float32)
+        self.model_id = str(model_id)
+        self.version = int(version)
+        self.rule_index = {key: i for i, key in enumerate(self.rule_keys)}
+        self.value_index = {value: i for i, value in enumerate(self.values)}
+        # Cosine similarity of every rule against every known value (embeddings are normalized)
+        self.scores = self.rule_embeddings @ self.value_embeddings.T
+
+    def rules(self):
+        return dict(zip(self.rule_keys, self.rule_texts))
+
+    def score(self, key, value):
+        """Similarity between rule `key` and a metric value — a table lookup, no model call"""
+        value = str(value)
+        if value not in self.value_index:
+            raise KeyError(f"Metric value '{value}' is not in the rulebook; recompile with it in metric_values")
+        return float(self.scores[self.rule_index[key], self.value_index[value]])
+
+    def save(self, path=DEFAULT_RULEBOOK_PATH):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        np.savez(
+            path,
+            version=self.version,
+            model_id=self.model_id,
+            rule_keys=np.array(self.rule_keys),
+            rule_texts=np.array(self.rule_texts),
+            rule_embeddings=self.rule_embeddings,
+            values=np.array(self.values),
+            value_embeddings=self.value_embeddings,
+        )
+
+    @classmethod
+    def load(cls, path=DEFAULT_RULEBOOK_PATH):
+        data = np.load(path)
+        version = int(data["version"])
+        if version != RULEBOOK_VERSION:
+            raise ValueError(f"Rulebook {path} has version {version}, expected {RULEBOOK_VERSION}; recompile it")
+        return cls(
+            data["rule_keys"].tolist(), data["rule_texts"].tolist(), data["rule_embeddings"],
+            data["values"].tolist(), data["value_embeddings"], str(data["model_id"]), version,
+        )
+
+
+def compile_rulebook(embedder, rules, metric_values=METRIC_VALUES, model_id="all-MiniLM-L6-v2",
+                     path=DEFAULT_RULEBOOK_PATH):
+    """Encode the rules and the metric-value vocabulary once and save them as a versioned artifact"""
+    keys = list(rules)
+    texts = [rules[key] for key in keys]
+    values = list(dict.fromkeys(str(v) for v in metric_values))
+    rulebook = Rulebook(
+        keys, texts,
+        normalize_rows(embedder.encode(texts, convert_to_numpy=True)),
+        values,
+        normalize_rows(embedder.encode(values, convert_to_numpy=True)),
+        model_id,
+    )
+    if path:
+        rulebook.save(path)
+    return rulebook
+
+
+def load_or_compile_rulebook(embedder, rules, metric_values=METRIC_VALUES, model_id="all-MiniLM-L6-v2",
+                             path=DEFAULT_RULEBOOK_PATH):
+    """Load the compiled rulebook, recompiling only if it is stale (rules, values, model or version changed)"""
+    if os.path.exists(path):
+        try:
+            rulebook = Rulebook.load(path)
+        except ValueError:
+            rulebook = None
+        if (rulebook is not None and rulebook.model_id == model_id and rulebook.rules() == dict(rules)
+                and set(str(v) for v in metric_values) <= set(rulebook.values)):
+            return rulebook
+    return compile_rulebook(embedder, rules, metric_values, model_id, path)
@@ -0,0 +1,269 @@
+# =========================
+# Segmented Corpus — append-only segments, tombstones and background compaction
+# =========================
+#
+# A directory of immutable corpus files (see corpus_store) plus a manifest:
+#   manifest.json   model id, next clause id, live segment names, tombstoned ids
+#   seg-XXXXXX.corpus  one file per add() batch, vectors stored L2-normalized
+#
+# Adding clauses writes a new small segment; deleting or amending a clause only
+# records a tombstone. Searches scan every segment and merge the results;
+# compaction folds all segments into one and drops tombstoned rows. A background
+# compactor (start_background_compaction) does this on a daemon thread whenever
+# too many segments accumulate, while adds and searches keep running.
+
+import json
+import os
+import threading
+
+import numpy as np
+
+from compliance_scoring import normalize_rows
+from corpus_store import CorpusStore, write_corpus
+from vector_index import top_k_rows
+
+DEFAULT_SEGMENTS_DIR = "data/processed/clauses_segments"
+MANIFEST_NAME = "manifest.json"
+
+
+class SegmentedCorpus:
+    """Incrementally updatable clause corpus; clause ids are stable across compactions"""
+
+    def __init__(self, directory=DEFAULT_SEGMENTS_DIR, model_id="all-MiniLM-L6-v2"):
+        self.directory = directory
+        self.model_id = model_id
+        self._lock = threading.RLock()
+        self._compaction_lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+        manifest_path = os.path.join(directory, MANIFEST_NAME)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if manifest["model_id"] != model_id:
+                raise ValueError(f"{directory} holds {manifest['model_id']} embeddings, not {model_id}")
+        else:
+            manifest = {"model_id": model_id, "next_id": 0, "next_segment": 0, "segments": [], "tombstones": []}
+        self.manifest = manifest
+        self.tombstones = set(manifest["tombstones"])
+        self.segments = {name: CorpusStore(os.path.join(directory, name)) for name in manifest["segments"]}
+
+    # ---------- manifest ----------
+
+    def _save_manifest(self):
+        self.manifest["segments"] = list(self.segments)
+        self.manifest["tombstones"] = sorted(self.tombstones)
+        path = os.path.join(self.directory, MANIFEST_NAME)
+        with open(path + ".tmp", "w") as f:
+            json.dump(self.manifest, f)
+        os.replace(path + ".tmp", path)
+
+    def _next_segment_path(self):
+        name = f"seg-{self.manifest['next_segment']:06d}.corpus"
+        self.manifest["next_segment"] += 1
+        return name, os.path.join(self.directory, name)
+
+    def _write_segment(self, texts, vectors, ids):
+        name, path = self._next_segment_path()
+        write_corpus(path, texts, vectors, self.model_id, ids=ids)
+        return name, CorpusStore(path)
+
+    # ---------- updates ----------
+
+    def add(self, texts, vectors):
+        """Append clauses as a new immutable segment; returns their clause ids"""
+        if not len(texts):
+            return []
+        with self._lock:
+            first = self.manifest["next_id"]
+            ids = np.arange(first, first + len(texts), dtype=np.uint64)
+            name, segment = self._write_segment(list(texts), normalize_rows(vectors), ids)
+            self.manifest["next_id"] = first + len(texts)
+            self.segments[name] = segment
+            self._save_manifest()
+        return ids.tolist()
+
+    def delete(self, clause_ids):
+        with self._lock:
+            self.tombstones.update(int(i) for i in clause_ids)
+            self._save_manifest()
+
+    def amend(self, clause_id, text, vector):
+        """Replace a clause: tombstone the old id and add the new text; returns the new id"""
+        with self._lock:
+            self.tombstones.add(int(clause_id))
+            return self.add([text], np.asarray(vector)[None, :])[0]
+
+    def add_texts(self, texts, embedder, pool=None):
+        """Add only texts not already live in the corpus, encoding just those.
+
+        With an encoding_pool.EncodingPool, the new segment is encoded across its
+        worker processes and streamed straight into the segment file.
+        """
+        live = set(text for _, text in self.items())
+        new_texts = [t for t in dict.fromkeys(texts) if t not in live]
+        if not new_texts:
+            return []
+        if pool is None:
+            return self.add(new_texts, embedder.encode(new_texts, convert_to_numpy=True))
+        with self._lock:
+            first = self.manifest["next_id"]
+            ids = np.arange(first, first + len(new_texts), dtype=np.uint64)
+            name, path = self._next_segment_path()
+            self.manifest["next_id"] = first + len(new_texts)
+        # Searches keep running on the existing segments while the pool encodes
+        pool.build_corpus(path, new_texts, model_id=self.model_id, ids=ids, normalize=True)
+        with self._lock:
+            self.segments[name] = CorpusStore(path)
+            self._save_manifest()
+        return ids.tolist()
+
+    # ---------- reads ----------
+
+    def _snapshot(self):
+        with self._lock:
+            return list(self.segments.values()), set(self.tombstones)
+
+    def __len__(self):
+        segments, tombstones = self._snapshot()
+        return sum(len(s) for s in segments) - sum(int(np.isin(s.ids, list(tombstones)).sum()) for s in segments)
+
+    def items(self):
+        """(clause_id, text) for every live clause"""
+        segments, tombstones = self._snapshot()
+        for segment in segments:
+            for row, clause_id in enumerate(segment.ids.tolist()):
+                if clause_id not in tombstones:
+                    yield clause_id, segment.texts[row]
+
+    def text(self, clause_id):
+        segments, tombstones = self._snapshot()
+        if clause_id in tombstones:
+            raise KeyError(clause_id)
+        for segment in segments:
+            row = np.searchsorted(segment.ids, clause_id)
+            if row < len(segment) and segment.ids[row] == clause_id:
+                return segment.texts[row]
+        raise KeyError(clause_id)
+
+    def search(self, queries, top_k=3):
+        """Merged top-k across all segments, skipping tombstones: (scores, clause_ids, texts)"""
+        queries = normalize_rows(queries)
+        segments, tombstones = self._snapshot()
+        dead = np.fromiter(tombstones, dtype=np.uint64, count=len(tombstones))
+        all_scores, all_ids, all_texts = [], [], []
+        for segment in segments:
+            if not len(segment):
+                continue
+            scores = queries @ np.asarray(segment.vectors).T
+            if len(dead):
+                scores[:, np.isin(segment.ids, dead)] = -np.inf
+            rows, best = top_k_rows(scores, top_k)
+            all_scores.append(best)
+            all_ids.append(np.asarray(segment.ids)[rows].astype(np.int64))
+            all_texts.append([[segment.texts[r] for r in row] for row in rows])
+        if not all_scores:
+            return np.empty((len(queries), 0)), np.empty((len(queries), 0), dtype=np.int64), [[] for _ in queries]
+
+        scores = np.concatenate(all_scores, axis=1)
+        ids = np.concatenate(all_ids, axis=1)
+        texts = [sum((seg_texts[q] for seg_texts in all_texts), []) for q in range(len(queries))]
+        cols, best = top_k_rows(scores, top_k)
+        merged_texts = []
+        for q, row in enumerate(cols):
+            keep = np.isfinite(best[q])
+            merged_texts.append([texts[q][c] for c, k in zip(row, keep) if k])
+        merged_ids = np.take_along_axis(ids, cols, axis=1)
+        return best, np.where(np.isfinite(best), merged_ids, -1), merged_texts
+
+    # ---------- compaction ----------
+
+    def compact(self):
+        """Merge all current segments into one, dropping tombstoned clauses"""
+        with self._compaction_lock:
+            with self._lock:
+                names = list(self.segments)
+                applied = set(self.tombstones)
+            if len(names) < 2 and not applied:
+                return False
+            texts, vectors, ids = [], [], []
+            for name in names:
+                segment = self.segments[name]
+                keep = ~np.isin(segment.ids, np.fromiter(applied, dtype=np.uint64, count=len(applied)))
+                rows = np.nonzero(keep)[0]
+                texts.extend(segment.texts[r] for r in rows)
+                vectors.append(np.asarray(segment.vectors)[rows])
+                ids.append(np.asarray(segment.ids)[rows])
+            dim = self.segments[names[0]].header["dim"] if names else 0
+            merged_vectors = np.concatenate(vectors) if vectors else np.zeros((0, dim), dtype=np.float32)
+            merged_ids = np.concatenate(ids) if ids else np.zeros(0, dtype=np.uint64)
+
+            with self._lock:
+                name, path = self._next_segment_path()
+            # Written outside the lock: searches and adds go on against the old segments
+            write_corpus(path, texts, merged_vectors, self.model_id, ids=merged_ids)
+            segment = CorpusStore(path)
+            with self._lock:
+                # Segments added while we were merging stay; the merged one replaces the rest
+                remaining = {n: s for n, s in self.segments.items() if n not in names}
+                self.segments = {name: segment, **remaining}
+                # Tombstones recorded during the merge still apply to the merged segment
+                self.tombstones -= applied
+                self._save_manifest()
+            for old in names:
+                os.remove(os.path.join(self.directory, old))
+            return True
+
+    def start_background_compaction(self, max_segments=8, interval=60):
+        """Start a BackgroundCompactor for this corpus; stop() it before the process exits"""
+        compactor = BackgroundCompactor(self, max_segments, interval)
+        compactor.start()
+        return compactor
+
+    def export(self, path):
+        """Write the live clauses as a single corpus file for the downstream steps (no re-embedding)"""
+        segments, tombstones = self._snapshot()
+        dead = np.fromiter(tombstones, dtype=np.uint64, count=len(tombstones))
+        texts, vectors = [], []
+        for segment in segments:
+            rows = np.nonzero(~np.isin(segment.ids, dead))[0]
+            texts.extend(segment.texts[r] for r in rows)
+            vectors.append(np.asarray(segment.vectors)[rows])
+        dim = segments[0].header["dim"] if segments else 0
+        merged = np.concatenate(vectors) if vectors else np.zeros((0, dim), dtype=np.float32)
+        return write_corpus(path, texts, merged, self.model_id)
+
+
+class BackgroundCompactor:
+    """Daemon thread that compacts a SegmentedCorpus whenever it holds more than `max_segments` segments.
+
+    Checks right away, then every `interval` seconds.
+    """
+
+    def __init__(self, corpus, max_segments=8, interval=60):
+        self.corpus = corpus
+        self.max_segments = max_segments
+        self.interval = interval
+        self.compactions = 0
+        self.error = None
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="segment-compaction", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            with self.corpus._lock:
+                needed = len(self.corpus.segments) > self.max_segments
+            if needed:
+                try:
+                    self.compactions += self.corpus.compact()
+                except Exception as e:  # keep serving; the segments are untouched until the swap
+                    self.error = e
+            if self._stop.wait(self.interval):
+                return
+
+    def stop(self, timeout=None):
+        """Stop checking and wait for a compaction in progress to finish"""
+        self._stop.set()
+        self._thread.join(timeout)
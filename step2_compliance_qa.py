@@ -2,48 +2,81 @@
 # Step 2 - Compliance Q&A Engine
 # =========================
 
-import torch, numpy as np, pandas as pd, json
-from sentence_transformers import SentenceTransformer, util
-from transformers import pipeline
+from model_registry import lazy_embedder, lazy_pipeline
+from batched_generation import explain_clauses
+from generation_cache import GenerationCache
+from vector_index import load_or_build_index
+from corpus_store import open_corpus
 
 # -------------------------------
 # Load embeddings and clauses from Step 1
 # -------------------------------
-clauses = pd.read_csv("data/processed/clauses_sample.csv")["clause"].tolist()
-embeddings = np.load("data/processed/corpus_embeddings.npy")
-embeddings = torch.tensor(embeddings)
+corpus = open_corpus("data/processed/clauses.corpus", model_id="all-MiniLM-L6-v2")
+clauses = corpus.texts
+embeddings = corpus.vectors  # memory-mapped, no copy
 
 print(f"Loaded {len(clauses)} clauses and embeddings.")
 
+# Flat (exact) index for small corpora, IVF above ~50k clauses; persisted next to the corpus.
+# IVF recall/latency is tuned with index.nprobe (number of lists scanned per query).
+# For multi-million clause corpora set INDEX_KIND to "float16" (2x), "int8" (4x) or
+# "binary" (32x less RAM): only compressed codes are held in memory and the top
+# index.rescore candidates are rescored against the memory-mapped float32 vectors.
+# "pca" / "prefix" instead keep 128-dim projected vectors (a third of the scan bandwidth;
+# the fitted projection is saved in the index file) and rescore with the full vectors.
+# Run bench_quantization.py to see the recall each tier costs on this corpus.
+INDEX_KIND = None
+index = load_or_build_index(embeddings, "data/processed/corpus_index.npz", kind=INDEX_KIND,
+                            fingerprint=corpus.header["checksum"], normalized=corpus.normalized)
+
 # Reload the same embedder used in Step 1
-embedder = SentenceTransformer("all-MiniLM-L6-v2")
+embedder = lazy_embedder("all-MiniLM-L6-v2")
 
 # -------------------------------
 # Semantic search function
 # -------------------------------
 def search(query, top_k=3):
-    query_emb = embedder.encode(query, convert_to_tensor=True)
-    hits = util.semantic_search(query_emb, embeddings, top_k=top_k)[0]
+    query_emb = embedder.encode(query, convert_to_numpy=True)
+    scores, ids = index.search(query_emb[None, :], top_k)
     results = []
-    for h in hits:
+    for score, corpus_id in zip(scores[0], ids[0]):
+        if corpus_id < 0:  # IVF may find fewer than top_k candidates
+            continue
         results.append({
-            "score": float(h["score"]),
-            "clause": clauses[h["corpus_id"]]
+            "score": float(score),
+            "clause": clauses[corpus_id]
         })
     return results
 
+def search_many(queries, top_k=3, batch_size=64):
+    """Batched search: one encode call, one score matrix, per-query partial top-k"""
+    query_embs = embedder.encode(list(queries), convert_to_numpy=True, batch_size=batch_size)
+    scores, ids = index.search(query_embs, top_k)
+    return [
+        [{"score": float(s), "clause": clauses[i]} for s, i in zip(row_scores, row_ids) if i >= 0]
+        for row_scores, row_ids in zip(scores, ids)
+    ]
+
 # -------------------------------
 # Summarizer and Simplifier
 # -------------------------------
-device = 0 if torch.cuda.is_available() else -1
-summarizer = pipeline("summarization", model="sshleifer/distilbart-cnn-12-6", device=device)
-simplifier = pipeline("text2text-generation", model="google/flan-t5-small", device=device)
+# Loaded on first use (GPU when available); thin clients of the model server when
+# COMPLIANCE_MODEL_SERVER is set
+summarizer = lazy_pipeline("summarization", "sshleifer/distilbart-cnn-12-6")
+simplifier = lazy_pipeline("text2text-generation", "google/flan-t5-small")
+# Explanations of clauses seen on earlier runs come straight from disk
+generation_cache = GenerationCache()
 
 def explain_clause(text):
-    summary = summarizer(text, max_length=120, min_length=30, do_sample=False)[0]['summary_text']
-    prompt = "Simplify the following legal clause into 3-4 clear action items:\n\n" + text
-    items = simplifier(prompt, max_length=200)[0]['generated_text']
-    return summary, items
+    return explain_clauses(summarizer, simplifier, [text], cache=generation_cache)[0]
+
+def explain_results(results):
+    """Explain every distinct clause in search_many results once: {clause: (summary, items)}.
+
+    Clauses are bucketed by length and run through two batched passes (summarize, then simplify).
+    """
+    unique_clauses = list(dict.fromkeys(hit["clause"] for hits in results for hit in hits))
+    return dict(zip(unique_clauses, explain_clauses(summarizer, simplifier, unique_clauses, cache=generation_cache)))
 
 # -------------------------------
 # Example Query
@@ -51,11 +84,31 @@ def explain_clause(text):
 query = "Where must customer data be stored?"
 results = search(query, top_k=3)
 
+explanations = explain_results([results])
+
 print(f"\nQuery: {query}\n")
 for r in results:
     print(f"Score: {r['score']:.3f}")
     print(f"Clause: {r['clause']}\n")
-    summary, items = explain_clause(r['clause'])
+    summary, items = explanations[r['clause']]
     print("Summary:", summary)
     print("Action Items:", items)
     print("\n---\n")
+
+# -------------------------------
+# Example Batch of Questions
+# -------------------------------
+questions = [
+    "Where must customer data be stored?",
+    "Who can access sensitive data?",
+    "Do vendors need a data protection agreement?",
+]
+batch_results = search_many(questions, top_k=2)
+explanations = explain_results(batch_results)  # each distinct clause explained once
+
+for question, hits in zip(questions, batch_results):
+    print(f"\nQuery: {question}")
+    for hit in hits:
+        summary, items = explanations[hit["clause"]]
+        print(f"  Score: {hit['score']:.3f} | Clause: {hit['clause']}")
+        print(f"  Action Items: {items}")
@@ -0,0 +1,45 @@
+# =========================
+# Paragraph Summarization — deduplicated, batched, cached on disk (see generation_cache)
+# =========================
+
+from generation_cache import GenerationCache
+
+
+def _summarize_one(summarizer, text, gen_kwargs):
+    try:
+        return summarizer(text, **gen_kwargs)[0]['summary_text']
+    except Exception:
+        return None
+
+
+def summarize_paragraphs(summarizer, paragraphs, model_name, cache=None, batch_size=8, **gen_kwargs):
+    """Summarize each distinct paragraph once, in batches; returns summaries aligned with paragraphs.
+
+    Paragraphs that cannot be summarized fall back to their original text and are not cached.
+    """
+    unique = list(dict.fromkeys(paragraphs))
+    keys = {text: GenerationCache.make_key(text, model_name, gen_kwargs) for text in unique}
+    cached = cache.get_many(keys.values()) if cache is not None else {}
+    summaries = {text: cached[keys[text]] for text in unique if keys[text] in cached}
+
+    pending = [text for text in unique if text not in summaries]
+    for start in range(0, len(pending), batch_size):
+        batch = pending[start:start + batch_size]
+        try:
+            outputs = summarizer(batch, batch_size=len(batch), **gen_kwargs)
+            batch_summaries = [out['summary_text'] for out in outputs]
+        except Exception:
+            # One bad paragraph fails the whole batch; retry individually
+            batch_summaries = [_summarize_one(summarizer, text, gen_kwargs) for text in batch]
+
+        new_entries = []
+        for text, summary in zip(batch, batch_summaries):
+            if summary is None:
+                summaries[text] = text
+            else:
+                summaries[text] = summary
+                new_entries.append((keys[text], summary))
+        if cache is not None and new_entries:
+            cache.put_many(new_entries)
+
+    return [summaries[text] for text in paragraphs]
@@ -0,0 +1,216 @@
+# =========================
+# Vector Index — exact flat scan or IVF approximate search over clause embeddings
+# =========================
+
+import hashlib
+import os
+
+import numpy as np
+
+from compliance_scoring import normalize_rows
+
+DEFAULT_INDEX_PATH = "data/processed/corpus_index.npz"
+IVF_MIN_VECTORS = 50_000  # below this a flat scan is fast enough
+MAX_SCORE_BLOCK = 32 * 1024 * 1024  # floats per query-block score matrix (~128 MB)
+QUANTIZED_KINDS = ("float16", "int8", "binary")  # see quantization.py
+REDUCED_KINDS = ("pca", "prefix")  # see projection.py
+
+
+def top_k_rows(scores, top_k):
+    """Per-row top-k (indices, scores) sorted by descending score, via partial sort"""
+    top_k = min(top_k, scores.shape[1])
+    if top_k <= 0:
+        empty = np.empty((scores.shape[0], 0))
+        return empty.astype(np.int64), empty.astype(scores.dtype)
+    part = np.argpartition(-scores, top_k - 1, axis=1)[:, :top_k]
+    part_scores = np.take_along_axis(scores, part, axis=1)
+    order = np.argsort(-part_scores, axis=1, kind="stable")
+    return np.take_along_axis(part, order, axis=1), np.take_along_axis(part_scores, order, axis=1)
+
+
+def rescore_candidates(vectors, queries, candidates, top_k):
+    """Exact phase of a two-phase search: full-precision cosine over each query's candidate rows.
+
+    `queries` must be normalized; `candidates` is (queries, n_candidates) row ids, and
+    only those rows of `vectors` (typically the corpus memmap) are read.
+    """
+    top_k = min(top_k, candidates.shape[1])
+    all_scores = np.empty((len(queries), top_k), dtype=np.float32)
+    all_ids = np.empty((len(queries), top_k), dtype=np.int64)
+    for q, rows in enumerate(candidates):
+        order = np.sort(rows)  # sequential reads from the memmap
+        exact = normalize_rows(vectors[order]) @ queries[q]
+        best, best_scores = top_k_rows(exact[None, :], top_k)
+        all_ids[q] = order[best[0]]
+        all_scores[q] = best_scores[0]
+    return all_scores, all_ids
+
+
+class FlatIndex:
+    """Exact cosine search: one matrix product against every vector"""
+
+    kind = "flat"
+
+    def __init__(self, vectors, normalized=False):
+        # An already normalized corpus memmap is scanned in place (no RAM copy)
+        self.vectors = vectors if normalized else normalize_rows(vectors)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def search(self, queries, top_k=3):
+        """(scores, ids), both shaped (queries, top_k)"""
+        queries = normalize_rows(queries)
+        block = max(1, MAX_SCORE_BLOCK // max(1, len(self.vectors)))
+        if len(queries) <= block:
+            ids, scores = top_k_rows(queries @ self.vectors.T, top_k)
+            return scores, ids
+        # Very large batches are scored in query blocks to bound the score-matrix memory
+        parts = [self.search(queries[start:start + block], top_k) for start in range(0, len(queries), block)]
+        return np.concatenate([p[0] for p in parts]), np.concatenate([p[1] for p in parts])
+
+    def state(self):
+        return {}
+
+
+class IVFIndex:
+    """Inverted-file index: spherical k-means lists, only `nprobe` lists are scanned per query.
+
+    `nprobe` is the recall/latency knob — more lists scanned means higher recall and
+    slower queries; nprobe == n_lists is an exact search.
+    """
+
+    kind = "ivf"
+
+    def __init__(self, vectors, centroids, offsets, ids, nprobe=8, normalized=False):
+        self.vectors = vectors if normalized else normalize_rows(vectors)
+        self.centroids = centroids
+        self.offsets = offsets
+        self.ids = ids
+        self.nprobe = nprobe
+
+    def __len__(self):
+        return len(self.vectors)
+
+    @classmethod
+    def build(cls, vectors, n_lists=None, nprobe=8, iterations=10, sample_size=100_000, seed=0, normalized=False):
+        if not normalized:
+            vectors = normalize_rows(vectors)
+        n = len(vectors)
+        n_lists = max(1, min(n, n_lists or int(np.sqrt(n))))
+        rng = np.random.default_rng(seed)
+        sample = vectors[rng.choice(n, size=min(n, sample_size), replace=False)]
+        centroids = sample[rng.choice(len(sample), size=n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assign = np.argmax(sample @ centroids.T, axis=1)
+            for c in range(n_lists):
+                members = sample[assign == c]
+                if len(members):
+                    centroids[c] = members.sum(axis=0)
+            centroids = normalize_rows(centroids)
+
+        assign = np.concatenate([
+            np.argmax(vectors[start:start + 65536] @ centroids.T, axis=1) for start in range(0, n, 65536)
+        ])
+        ids = np.argsort(assign, kind="stable").astype(np.int64)
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(assign, minlength=n_lists))]).astype(np.int64)
+        return cls(vectors, centroids, offsets, ids, nprobe, normalized=True)
+
+    def search(self, queries, top_k=3, nprobe=None):
+        queries = normalize_rows(queries)
+        nprobe = min(nprobe or self.nprobe, len(self.centroids))
+        top_k = min(top_k, len(self.vectors))
+        probe_lists, _ = top_k_rows(queries @ self.centroids.T, nprobe)
+        all_scores = np.full((len(queries), top_k), -np.inf, dtype=np.float32)
+        all_ids = np.full((len(queries), top_k), -1, dtype=np.int64)
+        for q, lists in enumerate(probe_lists):
+            candidates = np.concatenate([self.ids[self.offsets[l]:self.offsets[l + 1]] for l in lists])
+            if not len(candidates):
+                continue
+            scores = self.vectors[candidates] @ queries[q]
+            best, best_scores = top_k_rows(scores[None, :], top_k)
+            all_ids[q, :best.shape[1]] = candidates[best[0]]
+            all_scores[q, :best.shape[1]] = best_scores[0]
+        return all_scores, all_ids
+
+    def state(self):
+        return {"centroids": self.centroids, "offsets": self.offsets, "ids": self.ids, "nprobe": self.nprobe}
+
+
+def build_index(vectors, kind=None, normalized=False, **kwargs):
+    """Flat for small corpora, IVF above IVF_MIN_VECTORS unless `kind` says otherwise.
+
+    The quantized and reduced-dimension kinds keep only compressed codes (or projected
+    vectors) in RAM and rescore their top candidates against `vectors`. `normalized`
+    says the vectors are already unit-length (see CorpusStore.normalized).
+    """
+    kind = kind or ("ivf" if len(vectors) >= IVF_MIN_VECTORS else "flat")
+    if kind == "ivf":
+        return IVFIndex.build(vectors, normalized=normalized, **kwargs)
+    if kind in QUANTIZED_KINDS:
+        from quantization import QuantizedIndex
+
+        return QuantizedIndex.build(vectors, kind, **kwargs)
+    if kind in REDUCED_KINDS:
+        from projection import ReducedIndex
+
+        return ReducedIndex.build(vectors, kind, **kwargs)
+    return FlatIndex(vectors, normalized)
+
+
+def vectors_fingerprint(vectors, block=65536):
+    """Hash of every vector plus the shape (reads the whole array; prefer the corpus checksum)"""
+    digest = hashlib.blake2b(str(vectors.shape).encode(), digest_size=16)
+    for start in range(0, len(vectors), block):
+        digest.update(np.ascontiguousarray(vectors[start:start + block], dtype=np.float32).tobytes())
+    return digest.hexdigest()
+
+
+def save_index(index, path=DEFAULT_INDEX_PATH, fingerprint=""):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    np.savez(path, kind=index.kind, n_vectors=len(index), fingerprint=fingerprint, **index.state())
+
+
+def load_index(vectors, path=DEFAULT_INDEX_PATH, fingerprint=None, normalized=False):
+    """Rebuild an index from its persisted state plus the corpus vectors.
+
+    `fingerprint` identifies the vectors the index must have been built for,
+    normally the corpus header checksum; without it the vectors are hashed.
+    """
+    data = np.load(path)
+    if str(data["fingerprint"]) != (fingerprint or vectors_fingerprint(vectors)):
+        raise ValueError(f"Index {path} was built for a different corpus ({int(data['n_vectors'])} vectors)")
+    kind = str(data["kind"])
+    if kind == "ivf":
+        return IVFIndex(vectors, data["centroids"], data["offsets"], data["ids"], int(data["nprobe"]), normalized)
+    if kind in QUANTIZED_KINDS:
+        from quantization import QuantizedIndex
+
+        scales = data["scales"] if "scales" in data else None
+        return QuantizedIndex(vectors, kind, data["codes"], scales, int(data["rescore"]))
+    if kind in REDUCED_KINDS:
+        from projection import Projection, ReducedIndex
+
+        return ReducedIndex(vectors, Projection(data["components"], kind), data["reduced"], int(data["rescore"]))
+    return FlatIndex(vectors, normalized)
+
+
+def load_or_build_index(vectors, path=DEFAULT_INDEX_PATH, kind=None, fingerprint=None, normalized=False,
+                        **kwargs):
+    """Load the index persisted next to the corpus, building (and saving) it if missing or stale.
+
+    Pass the corpus checksum (`corpus.header["checksum"]`) as `fingerprint`: any
+    change to the corpus, such as an amended clause, then forces a rebuild. With
+    `normalized` (`corpus.normalized`) flat and IVF indexes search the memmap in place.
+    """
+    fingerprint = fingerprint or vectors_fingerprint(vectors)
+    if os.path.exists(path):
+        try:
+            index = load_index(vectors, path, fingerprint, normalized)
+            if kind is None or index.kind == kind:
+                return index
+        except ValueError:
+            pass
+    index = build_index(vectors, kind, normalized, **kwargs)
+    save_index(index, path, fingerprint)
+    return index